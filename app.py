@@ -1,447 +1,313 @@
-import json
-from datetime import datetime
+import logging
+import os
+import sys
+import uuid
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from diagnostic.analytics import load_cohort
+from diagnostic.batch import MAX_OUTCOMES
+from diagnostic.catalog import get_catalog
+from diagnostic.loader import TreeError
+from diagnostic.scoring import score_summary
+from diagnostic.search import get_index
+from diagnostic.state import IDLE_SECONDS, PackedState, SessionRegistry, StateError, bits, decode, encode, positions
+from diagnostic import telemetry
+from diagnostic.store import get_store, is_complete
+from diagnostic.telemetry import span
+from diagnostic.tenants import DEFAULT_TENANT, get_registry
+
+log = logging.getLogger(__name__)
 
 st.set_page_config(page_title="Enterprise Direction Diagnostic (Decision Tree)", layout="wide")
+telemetry.setup_from_env()
 
 # -----------------------------
-# Decision tree definition
+# Helpers
 # -----------------------------
-TREE = {
-    "Operational Excellence": {
-        "question_lvl1": "Q2A: What is the primary driver?",
-        "options_lvl1": {
-            "Cost / Efficiency": {
-                "outcome_lvl2": "Margin-protection / cost-to-serve reduction focus.",
-                "question_lvl2": "Q3A1: Where is cost leaking most?",
-                "options_lvl2": [
-                    "Labor effort (manual work / overtime)",
-                    "Rework / repeat handling",
-                    "Hand-offs & delays",
-                    "Vendor / procurement cost",
-                    "Technology / licensing / legacy cost",
-                ],
-                "question_lvl3": "Q4A1: What is the biggest root pattern?",
-                "options_lvl3": [
-                    "No standard work / unclear SOPs",
-                    "Work intake unmanaged (too much WIP)",
-                    "Poor demand forecasting / staffing model",
-                    "Process variation across teams/sites",
-                    "Systems fragmentation (multiple tools, re-keying)",
-                ],
-                "metrics": [
-                    "Cost-to-serve trend (12–18 months)",
-                    "Unit cost per transaction (before/after)",
-                    "% value-add time vs waiting time",
-                    "Overtime hours, backlog age",
-                    "Savings realized vs 'paper savings'",
-                ],
-            },
-            "Quality / Defects": {
-                "outcome_lvl2": "Defect reduction and right-first-time stability focus.",
-                "question_lvl2": "Q3A2: What type of quality failure dominates?",
-                "options_lvl2": [
-                    "Data accuracy errors",
-                    "Compliance/validation errors",
-                    "Customer-impacting defects",
-                    "Rework loops (case reopened)",
-                    "Supplier/3rd party defects",
-                ],
-                "question_lvl3": "Q4A2: Where is the defect source most likely?",
-                "options_lvl3": [
-                    "Inputs (bad data / incomplete request)",
-                    "Methods (no control plan / no checks)",
-                    "People (skills / training gaps)",
-                    "Systems (rule gaps / automation logic)",
-                    "Environment (handoffs / queueing / pressure)",
-                ],
-                "metrics": [
-                    "First-pass yield / right-first-time %",
-                    "Defect rate per 1,000 transactions",
-                    "Rework hours and cost of poor quality",
-                    "Audit findings trend",
-                    "% recurring defects (Pareto repeat)",
-                ],
-            },
-            "SLA / Customer Experience": {
-                "outcome_lvl2": "Reliability, responsiveness and customer trust focus.",
-                "question_lvl2": "Q3A3: What is breaking SLA performance?",
-                "options_lvl2": [
-                    "Peaks/seasonality demand",
-                    "Bottleneck steps",
-                    "Long approvals",
-                    "Rework loops",
-                    "External dependencies",
-                ],
-                "question_lvl3": "Q4A3: Which control mechanism is missing?",
-                "options_lvl3": [
-                    "Clear SLA definitions & segmentation",
-                    "Real-time visibility (dashboards)",
-                    "Queue/WIP limits and prioritization rules",
-                    "Escalation rules & triage",
-                    "Ownership and daily management rhythm",
-                ],
-                "metrics": [
-                    "SLA attainment % by segment",
-                    "Aging distribution (p50/p90/p99)",
-                    "Customer satisfaction (CSAT/NPS) trend",
-                    "Backlog size and burn-down",
-                    "# escalations / complaints per month",
-                ],
-            },
-            "Regulatory / Risk": {
-                "outcome_lvl2": "Assurance, audit readiness and risk containment focus.",
-                "question_lvl2": "Q3A4: What risk class is most critical?",
-                "options_lvl2": [
-                    "Regulatory compliance breaches",
-                    "Financial / reporting risk",
-                    "Operational risk (process failures)",
-                    "Data privacy & security",
-                    "Third-party / vendor risk",
-                ],
-                "question_lvl3": "Q4A4: Where is the control weakness?",
-                "options_lvl3": [
-                    "Control design missing / outdated",
-                    "Control execution inconsistent",
-                    "Evidence not captured",
-                    "Roles unclear (RACI gaps)",
-                    "Monitoring not proactive (only after incident)",
-                ],
-                "metrics": [
-                    "Audit issues count & severity trend",
-                    "Control effectiveness rate",
-                    "Time to close audit findings",
-                    "Incident frequency & loss impact",
-                    "% processes with documented controls + evidence",
-                ],
-            },
-            "Productivity / Capacity Scaling": {
-                "outcome_lvl2": "Handle higher volumes without proportional headcount.",
-                "question_lvl2": "Q3A5: What is limiting throughput?",
-                "options_lvl2": [
-                    "Too much manual handling",
-                    "Skills capacity / specialization constraints",
-                    "Bottleneck roles / approvals",
-                    "Tool limitations / system latency",
-                    "Poor demand management / intake quality",
-                ],
-                "question_lvl3": "Q4A5: What scaling lever is most feasible?",
-                "options_lvl3": [
-                    "Standard work + training academy",
-                    "Automation (RPA/workflow)",
-                    "Self-service / better inputs",
-                    "Role redesign / cross-skilling",
-                    "Load balancing across teams/sites",
-                ],
-                "metrics": [
-                    "Output per FTE trend",
-                    "Volume vs headcount ratio",
-                    "Cycle time trend under peak loads",
-                    "Utilization vs burnout indicators",
-                    "Automation coverage (% steps automated)",
-                ],
-            },
-        },
-    },
-    "Innovation": {
-        "question_lvl1": "Q2B: Which innovation type is dominant?",
-        "options_lvl1": {
-            "Product / Service": {
-                "outcome_lvl2": "Differentiation through new offerings.",
-                "question_lvl2": "Q3B1: Where is the innovation bottleneck?",
-                "options_lvl2": [
-                    "Weak customer insight / VOC",
-                    "Too many ideas, no selection",
-                    "Slow prototyping",
-                    "Poor handoff to delivery/ops",
-                    "Weak go-to-market",
-                ],
-                "question_lvl3": "Q4B1: Which engine is missing?",
-                "options_lvl3": [
-                    "Innovation funnel + stage gates",
-                    "Rapid experimentation (MVP discipline)",
-                    "Portfolio prioritization (value vs effort)",
-                    "Cross-functional squads",
-                    "Commercialization playbook",
-                ],
-                "metrics": [
-                    "Time-to-market",
-                    "% revenue from new offerings (12–24 months)",
-                    "Win/loss rate of launches",
-                    "Adoption and retention",
-                    "Pipeline value vs conversion rate",
-                ],
-            },
-            "Digital Experience": {
-                "outcome_lvl2": "Better customer/employee experience via digital.",
-                "question_lvl2": "Q3B2: What’s the dominant barrier?",
-                "options_lvl2": [
-                    "Legacy platforms",
-                    "Fragmented journeys",
-                    "Poor UX ownership",
-                    "Data fragmentation",
-                    "Adoption resistance",
-                ],
-                "question_lvl3": "Q4B2: Where will impact be highest?",
-                "options_lvl3": [
-                    "End-to-end journey redesign",
-                    "Omnichannel integration",
-                    "Digital self-service",
-                    "Personalization",
-                    "Digital governance & product ownership",
-                ],
-                "metrics": [
-                    "Digital adoption rate",
-                    "Drop-off / abandonment rate",
-                    "Journey time reduction",
-                    "Self-service containment %",
-                    "CSAT/NPS change by journey",
-                ],
-            },
-            "AI / Data Innovation": {
-                "outcome_lvl2": "Competing with intelligence (prediction, automation, decision support).",
-                "question_lvl2": "Q3B3: What’s the biggest constraint?",
-                "options_lvl2": [
-                    "Data quality / availability",
-                    "Governance & privacy",
-                    "Skills (ML/AI/product)",
-                    "Use-case prioritization",
-                    "MLOps / deployment capability",
-                ],
-                "question_lvl3": "Q4B3: What is the AI operating model today?",
-                "options_lvl3": [
-                    "Experiments only (PoCs)",
-                    "Pilots in isolated teams",
-                    "Embedded into workflows",
-                    "Scaled platform capability",
-                    "AI governance + measurable value engine",
-                ],
-                "metrics": [
-                    "# AI use cases scaled (not just PoC)",
-                    "Model performance + drift control",
-                    "Time from idea → deployment",
-                    "Savings/revenue attributable to AI",
-                    "Adoption of AI features in daily work",
-                ],
-            },
-            "Business Model": {
-                "outcome_lvl2": "Changing how you create/capture value (pricing, subscriptions, ecosystem).",
-                "question_lvl2": "Q3B4: What is forcing the model change?",
-                "options_lvl2": [
-                    "Margin compression",
-                    "New entrant disruption",
-                    "Channel disintermediation",
-                    "Customer preference shifts",
-                    "Regulation/market structure",
-                ],
-                "question_lvl3": "Q4B4: Which model shift are you exploring?",
-                "options_lvl3": [
-                    "Subscription / recurring revenue",
-                    "Outcome-based pricing",
-                    "Platform/ecosystem partnerships",
-                    "Bundling/unbundling",
-                    "New cost structure (variable vs fixed)",
-                ],
-                "metrics": [
-                    "Gross margin improvement",
-                    "Recurring revenue %",
-                    "CAC/LTV metrics",
-                    "Churn and expansion revenue",
-                    "Partner contribution to revenue",
-                ],
-            },
-            "Market / Channel Expansion": {
-                "outcome_lvl2": "Growth through new geographies, segments, channels.",
-                "question_lvl2": "Q3B5: Where is friction?",
-                "options_lvl2": [
-                    "Weak segment targeting",
-                    "Sales enablement gaps",
-                    "Operational capability not ready",
-                    "Partner/channel strategy unclear",
-                    "Brand trust barrier",
-                ],
-                "question_lvl3": "Q4B5: What capability is missing to scale expansion?",
-                "options_lvl3": [
-                    "Segment strategy & ICP definition",
-                    "Channel operating model (direct/partner)",
-                    "Fulfillment readiness",
-                    "Local compliance readiness",
-                    "Marketing/sales performance engine",
-                ],
-                "metrics": [
-                    "Market share change",
-                    "Revenue growth by segment",
-                    "Channel conversion rates",
-                    "Fulfillment SLA in new markets",
-                    "Expansion cost vs plan",
-                ],
-            },
-        },
-    },
-    "Hybrid": {
-        "question_lvl1": "Q2C: Which pattern best describes you?",
-        "options_lvl1": {
-            "Stabilize core first, then innovate": {
-                "outcome_lvl2": "Foundation and trust-building first.",
-                "question_lvl2": "Q3C1: What must be stabilized?",
-                "options_lvl2": [
-                    "Process standardization",
-                    "KPI governance & visibility",
-                    "Control effectiveness",
-                    "Capability baseline (training)",
-                    "Tech reliability / tooling",
-                ],
-                "question_lvl3": "Q4C1: What is the best stabilization lever?",
-                "options_lvl3": [
-                    "Standard work + daily management",
-                    "Controls & audit readiness program",
-                    "Process ownership model",
-                    "Skills academy + certifications",
-                    "System simplification / workflow",
-                ],
-                "metrics": [
-                    "Stability indicators (variance reduction)",
-                    "SLA reliability (p90 aging)",
-                    "Audit/control metrics trend",
-                    "Process compliance rate",
-                    "# stabilized processes ready for innovation",
-                ],
-            },
-            "Innovate while fixing": {
-                "outcome_lvl2": "High-velocity change with KPI/conflict risk.",
-                "question_lvl2": "Q3C2: Where is conflict appearing?",
-                "options_lvl2": [
-                    "Cost vs growth priorities",
-                    "Compliance vs experimentation",
-                    "Talent allocation conflict",
-                    "Tooling/platform conflict",
-                    "Governance confusion",
-                ],
-                "question_lvl3": "Q4C2: Which guardrail model fits you?",
-                "options_lvl3": [
-                    "Innovation sandbox with controls",
-                    "Dual KPI scoreboard (exploit/explore)",
-                    "Portfolio governance (capacity allocation)",
-                    "Dual operating system (core vs venture)",
-                    "Clear escalation and decision rights",
-                ],
-                "metrics": [
-                    "Capacity split (core vs innovation)",
-                    "Innovation throughput (# experiments/month)",
-                    "Core performance not degrading (SLA/cost)",
-                    "Engagement/burnout trends",
-                    "Risk incidents during experimentation",
-                ],
-            },
-            "Separate units (ambidextrous by design)": {
-                "outcome_lvl2": "Structural ambidexterity with different operating rules.",
-                "question_lvl2": "Q3C3: How is separation implemented?",
-                "options_lvl2": [
-                    "Separate teams under same leadership",
-                    "Separate P&L/business units",
-                    "Innovation lab / venture studio",
-                    "Platform team supporting both",
-                    "Outsourced innovation partners",
-                ],
-                "question_lvl3": "Q4C3: What integration mechanism is missing?",
-                "options_lvl3": [
-                    "Shared architecture principles",
-                    "Transition path (pilot → core ops)",
-                    "Governance on prioritization",
-                    "Talent rotation model",
-                    "Shared data platform",
-                ],
-                "metrics": [
-                    "% pilots successfully transitioned to ops",
-                    "Time to industrialize innovation",
-                    "Duplicate work reduction",
-                    "Decision speed (governance cycle time)",
-                    "Combined scorecard health (margin + growth)",
-                ],
-            },
-        },
-    },
-}
-
-FINAL_OUTCOMES = [
-    "Financial (EBITDA, margin, cost-to-serve)",
-    "Customer (NPS/CSAT, complaints)",
-    "Process (cycle time, defects, SLA)",
-    "Risk (audit findings, incidents)",
-    "Capability (skills index, adoption, engagement)",
-]
+def session_tree():
+    # The tenant registry keeps compiled trees for recently used tenants in
+    # one size-bounded cache and only recompiles when a definition changes.
+    # A session keeps the version it started on until it is reset, as long
+    # as that version is still held in memory; only then is the definition
+    # checked for a newer one. A definition that fails to reload keeps
+    # serving its last good version.
+    ss = st.session_state
+    tenant = st.query_params.get("tenant", DEFAULT_TENANT)
+    if ss.get("tenant") != tenant:
+        ss.pop("tree_version", None)
+        ss["tenant"] = tenant
+    registry = get_registry()
+    pinned = ss.get("tree_version")
+    if pinned is not None:
+        tree = registry.get_version(tenant, pinned)
+        if tree is not None:
+            return tree
+    try:
+        latest = registry.get(tenant)
+    except TreeError as exc:
+        st.error(str(exc))
+        st.stop()
+    ss["tree_version"] = latest.version
+    return latest
+
+def selection_key(depth):
+    return "sel_direction" if depth == 0 else f"sel_lvl{depth}"
+
+def clear_below(depth):
+    # Deeper answers and metric ticks belong to the previous branch. Keys are
+    # probed level by level instead of scanning the whole session state;
+    # depth -1 clears every answer.
+    ss = st.session_state
+    while selection_key(depth + 1) in ss:
+        del ss[selection_key(depth + 1)]
+        depth += 1
+    i = 0
+    while f"chk_{i}" in ss:
+        del ss[f"chk_{i}"]
+        i += 1
+
+def jump_to(tree, hit):
+    """Point the selection widgets at ``hit`` before the next run renders them."""
+    ss = st.session_state
+    if hit.path is None:
+        outcome = tree.outcome_index[hit.text]
+        outcomes = ss.get("sel_outcomes", [])
+        if outcome not in outcomes and len(outcomes) < MAX_OUTCOMES:
+            ss["sel_outcomes"] = outcomes + [outcome]
+        return
+    if not hit.path:
+        return
+    for depth, index in enumerate(hit.path):
+        ss[selection_key(depth)] = index
+    clear_below(len(hit.path) - 1)
+
+def reset():
+    ss = st.session_state
+    clear_below(-1)
+    for k in ("sel_outcomes", "txt_notes", "txt_success", "txt_search", "summary_cache", "tree_version"):
+        ss.pop(k, None)
+    if "s" in st.query_params:
+        del st.query_params["s"]
+
 
 # -----------------------------
-# Helpers
+# Compact state
 # -----------------------------
-def reset():
-    for k in list(st.session_state.keys()):
-        if k.startswith("sel_") or k.startswith("txt_") or k.startswith("chk_"):
-            del st.session_state[k]
+# Widgets hold option indices and metric/outcome positions rather than their
+# text; the whole session packs into a PackedState that also lives in the URL.
+def packed_state(tree, path):
+    ss = st.session_state
+    n_metrics = len(tree.path_metrics(path))
+    return PackedState(
+        path,
+        metrics=bits(i for i in range(n_metrics) if ss.get(f"chk_{i}", False)),
+        outcomes=bits(ss.get("sel_outcomes", [])),
+        notes=ss.get("txt_notes", ""),
+        success=ss.get("txt_success", ""),
+    )
+
+def restore_from_url(tree):
+    """Seed a new session from the ``s`` query parameter, if it has one."""
+    ss = st.session_state
+    if ss.get("restored"):
+        return
+    ss["restored"] = True
+    token = st.query_params.get("s")
+    if not token:
+        return
+    try:
+        state = decode(token, tree.version)
+        tree.resolve(state.path)
+    except (StateError, IndexError):
+        st.toast("The link's saved answers don't match the current diagnostic; starting fresh.")
+        return
+    for depth, index in enumerate(state.path):
+        ss[selection_key(depth)] = index
+    # Bits beyond the path's metrics would seed checkboxes that never render.
+    for i in positions(state.metrics & ((1 << len(tree.path_metrics(state.path))) - 1)):
+        ss[f"chk_{i}"] = True
+    ss["sel_outcomes"] = [o for o in positions(state.outcomes) if o < len(tree.final_outcomes)][:MAX_OUTCOMES]
+    ss["txt_notes"] = state.notes
+    ss["txt_success"] = state.success
+
+def sync_state(tree, path):
+    """Mirror the packed state into the URL, store it once complete and account for the session's footprint."""
+    token = encode(packed_state(tree, path), tree.version)
+    summary, _ = current_summary(tree, path)
+    if is_complete(summary):
+        # Queued for the background writer; the session's stored record is
+        # replaced by its latest state, and unchanged states are skipped.
+        with span("store_submit"):
+            get_store().submit(
+                summary,
+                session_id=st.session_state["session_id"],
+                tree=tree,
+                path=path,
+                workshop=st.query_params.get("workshop"),
+                tenant=st.session_state["tenant"],
+            )
+    if st.query_params.get("s") != token:
+        st.query_params["s"] = token
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        nbytes = len(token) + sum(sys.getsizeof(v) for v in st.session_state.values())
+        session_registry().touch(ctx.session_id, nbytes)
 
-def now_iso():
-    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+def _close_session(session_id):
+    # Streamlit has no public API for ending another session; this reaches
+    # into the runtime's session manager. The browser reconnects into a new
+    # session and restores its answers from the URL.
+    try:
+        from streamlit.runtime import Runtime
+
+        Runtime.instance()._session_mgr.close_session(session_id)
+    except Exception:
+        log.exception("could not evict session %s", session_id)
+
+def _session_alive(session_id):
+    # Same private session manager as above; outside a running server every
+    # session counts as gone.
+    try:
+        from streamlit.runtime import Runtime
+
+        return Runtime.instance()._session_mgr.get_session_info(session_id) is not None
+    except Exception:
+        return False
+
+@st.cache_resource
+def session_registry():
+    budget = int(os.environ.get("DIAGNOSTIC_SESSION_BUDGET_MB", "512")) * 1024 * 1024
+    idle = float(os.environ.get("DIAGNOSTIC_SESSION_IDLE_SECONDS", str(IDLE_SECONDS)))
+    return SessionRegistry(budget, _close_session, idle_seconds=idle, is_alive=_session_alive)
+
+
+def current_summary(tree, path):
+    """Return ``(summary, summary_json)``, rebuilt only when the inputs change.
+
+    The timestamp is taken when the inputs last changed, so reruns that leave
+    the state untouched reuse the cached dict and its serialized form.
+    """
+    state = packed_state(tree, path)
+    # Paths are indices, so the same path on another tree version has other labels.
+    key = (tree.version, state.path, state.metrics, tuple(st.session_state.get("sel_outcomes", [])), state.notes,
+           state.success)
+
+    cached = st.session_state.get("summary_cache")
+    if cached is None or cached[0] != key:
+        # The catalog holds the path's template and pre-serialized JSON; only
+        # the session's own input is merged in and serialized here.
+        catalog = get_catalog(tree)
+        metrics = tree.path_metrics(path)
+        with span("summary_build"):
+            summary = catalog.summary(
+                path,
+                tracked_metrics=[metrics[i] for i in positions(state.metrics)],
+                notes=state.notes,
+                outcomes=[tree.final_outcomes[i] for i in key[3]],
+                success=state.success,
+            )
+        with span("json_serialize"):
+            cached = (key, summary, catalog.summary_json(path, summary))
+        st.session_state["summary_cache"] = cached
+    return cached[1], cached[2]
 
 
 # -----------------------------
-# UI
+# Fragments
 # -----------------------------
-st.title("Enterprise Strategic Direction — Interactive Decision Tree")
-st.caption("Deep branching diagnostic (Direction → Driver/Type → Constraint/Pattern → Metrics → Outcomes).")
-
-with st.sidebar:
-    st.header("Controls")
-    if st.button("Reset all selections"):
-        reset()
-        st.rerun()
-
-col1, col2 = st.columns([1.2, 1])
-
-with col1:
-    st.subheader("Q1. On which direction is the company moving?")
-    direction = st.radio(
-        "Select one",
-        ["Operational Excellence", "Innovation", "Hybrid"],
-        key="sel_direction",
-        horizontal=True,
+# Widgets inside a fragment only rerun that fragment. The answers and the
+# summary/export built from them share one fragment, so ticking a metric or
+# editing an outcome redraws the summary and its download in the same rerun
+# without re-executing the tree lookup, the URL restore or the sidebar.
+@st.fragment
+def search_panel(tree):
+    telemetry.RERUNS.inc("search_panel")
+    st.subheader("Search the tree")
+    query = st.text_input(
+        "Questions, options, metrics, outcomes",
+        placeholder="e.g., backlog, SLA, data quality",
+        key="txt_search",
     )
+    if not query:
+        return
+    with span("search"):
+        hits = get_index(tree).search(query, limit=8)
+    if not hits:
+        st.caption("No matches.")
+    for i, hit in enumerate(hits):
+        where = "Final outcome" if hit.path is None else " → ".join(tree.path_labels(hit.path))
+        # The callback updates the selections before any widget is drawn;
+        # the full rerun then redraws the path outside this fragment.
+        if st.button(hit.text, key=f"hit_{i}", help=f"{hit.kind}: {where}", on_click=jump_to,
+                     args=(tree, hit), use_container_width=True):
+            st.rerun()
 
-    node = TREE[direction]
 
-    st.divider()
-    st.subheader(node["question_lvl1"])
-    lvl1_choice = st.selectbox(
-        "Choose the best fit",
-        list(node["options_lvl1"].keys()),
-        key="sel_lvl1",
-    )
+@st.fragment
+def diagnostic_section(tree):
+    telemetry.RERUNS.inc("diagnostic_section")
+    col1, col2 = st.columns([1.2, 1])
 
-    leaf = node["options_lvl1"][lvl1_choice]
+    with col1, span("widget_render"):
+        path = path_panel(tree)
+    telemetry.touch_session(st.session_state["session_id"], tree.path_labels(path[:1])[0])
 
-    st.info(f"**Outcome:** {leaf['outcome_lvl2']}")
+    with col2, span("widget_render"):
+        metrics_panel(tree, path)
+        st.divider()
+        outcomes_panel(tree, path)
+    sync_state(tree, path)
 
-    st.divider()
-    st.subheader(leaf["question_lvl2"])
-    lvl2_choice = st.selectbox(
-        "Select one",
-        leaf["options_lvl2"],
-        key="sel_lvl2",
-    )
+    summary_section(tree, path)
 
-    st.divider()
-    st.subheader(leaf["question_lvl3"])
-    lvl3_choice = st.selectbox(
-        "Select one",
-        leaf["options_lvl3"],
-        key="sel_lvl3",
-    )
 
-with col2:
+def path_panel(tree):
+    # Walk the tree one question per level until a leaf is reached; the path
+    # is the tuple of chosen option indices.
+    path = []
+    nid = tree.root
+    while not tree.is_leaf(nid):
+        depth = len(path)
+        if depth:
+            st.divider()
+        st.subheader(tree.question(nid))
+        key = selection_key(depth)
+        options = tree.options(nid)
+        if st.session_state.get(key, 0) >= len(options):
+            del st.session_state[key]
+        if depth == 0:
+            index = st.radio(
+                "Select one",
+                range(len(options)),
+                format_func=options.__getitem__,
+                key=key,
+                horizontal=True,
+                on_change=clear_below,
+                args=(depth,),
+            )
+        else:
+            index = st.selectbox(
+                "Choose the best fit" if depth == 1 else "Select one",
+                range(len(options)),
+                format_func=options.__getitem__,
+                key=key,
+                on_change=clear_below,
+                args=(depth,),
+            )
+        path.append(index)
+        nid = tree.child(nid, index)
+
+        if tree.outcome(nid):
+            st.info(f"**Outcome:** {tree.outcome(nid)}")
+    return tuple(path)
+
+
+def metrics_panel(tree, path):
     st.subheader("How did you do? (Evidence & metrics)")
     st.write("Pick the metrics you already track and add notes if needed.")
-    metric_checks = {}
-    for m in leaf["metrics"]:
-        metric_checks[m] = st.checkbox(m, key=f"chk_{m}")
+    for i, m in enumerate(tree.path_metrics(path)):
+        st.checkbox(m, key=f"chk_{i}")
 
     st.text_area(
         "Notes / evidence (optional)",
@@ -450,14 +316,15 @@ with col2:
         height=140,
     )
 
-    st.divider()
+
+def outcomes_panel(tree, path):
     st.subheader("Final outcomes (12–18 months)")
-    outcomes = st.multiselect(
+    st.multiselect(
         "Pick top 3 outcomes that must improve",
-        FINAL_OUTCOMES,
-        default=[],
+        range(len(tree.final_outcomes)),
+        format_func=tree.final_outcomes.__getitem__,
         key="sel_outcomes",
-        max_selections=3,
+        max_selections=MAX_OUTCOMES,
     )
 
     st.text_input(
@@ -466,55 +333,99 @@ with col2:
         key="txt_success",
     )
 
+
+def summary_section(tree, path):
+    st.divider()
+    st.header("Diagnostic summary")
+
+    # Memoized per state change: reruns that leave the answers untouched
+    # reuse the summary and its serialized JSON.
+    summary, summary_json = current_summary(tree, path)
+    selected_metrics = summary["selected_metrics_tracked"]
+    with span("scoring"):
+        scores = score_summary(tree, summary, path=path)
+    with span("cohort"):
+        # Reads the cohort's rollup rows only, kept current by the store writer.
+        cohort = load_cohort(
+            get_store(), tree, path, st.query_params.get("workshop"), st.session_state["session_id"],
+            st.session_state["tenant"],
+        )
+
+    with span("export"):
+        render_summary(tree, get_catalog(tree).entry(path), summary, summary_json, selected_metrics, scores, cohort)
+
+
+def render_summary(tree, entry, summary, summary_json, selected_metrics, scores, cohort):
+    left, right = st.columns([1.2, 1])
+
+    with left:
+        st.markdown("### What we learned")
+        st.markdown(entry.learned)
+        if summary["target_outcomes_12_18_months"]:
+            st.write("**12–18 month outcomes:** " + "; ".join(summary["target_outcomes_12_18_months"]))
+        if summary["success_statement"]:
+            st.success(summary["success_statement"])
+
+        if selected_metrics:
+            st.write("**Metrics currently tracked:**")
+            st.write("- " + "\n- ".join(selected_metrics))
+        else:
+            st.warning("No metrics selected yet. Consider choosing at least 2–3 metrics for evidence.")
+
+        st.markdown("### Maturity scores")
+        for dimension, score in scores.items():
+            st.progress(score / 100, text=f"{dimension}: {score:.0f}/100")
+
+        st.markdown("### Compared with your cohort")
+        if cohort.total:
+            st.write(
+                f"You track {len(selected_metrics)} of {len(summary['recommended_metrics'])} recommended metrics; "
+                f"the cohort p50 is {cohort.quantile(0.5)}, p90 is {cohort.quantile(0.9)} "
+                f"({cohort.total} other participants)."
+            )
+            st.dataframe(
+                [{"Peers chose": label, "Share": 100 * share} for label, share in cohort.lever_shares(tree)],
+                column_config={"Share": st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=100)},
+                use_container_width=True,
+                hide_index=True,
+            )
+        else:
+            st.caption("No other participants in this cohort yet.")
+
+    with right:
+        st.markdown("### Export")
+        st.download_button(
+            "Download summary as JSON",
+            data=summary_json,
+            file_name="enterprise_direction_diagnostic_summary.json",
+            mime="application/json",
+            use_container_width=True,
+        )
+        st.code(summary_json, language="json")
+
+
 # -----------------------------
-# Summary + Export
+# UI
 # -----------------------------
-st.divider()
-st.header("Diagnostic summary")
-
-selected_metrics = [m for m, v in metric_checks.items() if v]
-
-summary = {
-    "timestamp_utc": now_iso(),
-    "direction": direction,
-    "level_1_choice": lvl1_choice,
-    "level_2_choice": lvl2_choice,
-    "level_3_choice": lvl3_choice,
-    "recommended_metrics": leaf["metrics"],
-    "selected_metrics_tracked": selected_metrics,
-    "notes": st.session_state.get("txt_notes", ""),
-    "target_outcomes_12_18_months": st.session_state.get("sel_outcomes", []),
-    "success_statement": st.session_state.get("txt_success", ""),
-}
-
-left, right = st.columns([1.2, 1])
-
-with left:
-    st.markdown("### What we learned")
-    st.write(f"**Direction:** {summary['direction']}")
-    st.write(f"**Driver/Type:** {summary['level_1_choice']}")
-    st.write(f"**Primary pain/constraint:** {summary['level_2_choice']}")
-    st.write(f"**Likely root pattern / lever:** {summary['level_3_choice']}")
-    if summary["target_outcomes_12_18_months"]:
-        st.write("**12–18 month outcomes:** " + "; ".join(summary["target_outcomes_12_18_months"]))
-    if summary["success_statement"]:
-        st.success(summary["success_statement"])
-
-    if selected_metrics:
-        st.write("**Metrics currently tracked:**")
-        st.write("- " + "\n- ".join(selected_metrics))
-    else:
-        st.warning("No metrics selected yet. Consider choosing at least 2–3 metrics for evidence.")
-
-with right:
-    st.markdown("### Export")
-    st.download_button(
-        "Download summary as JSON",
-        data=json.dumps(summary, indent=2),
-        file_name="enterprise_direction_diagnostic_summary.json",
-        mime="application/json",
-        use_container_width=True,
-    )
-    st.code(json.dumps(summary, indent=2), language="json")
+# Every full run is timed section by section; a sampled fraction is also
+# profiled when DIAGNOSTIC_PROFILE_RATE is set.
+telemetry.RERUNS.inc("app")
+st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+with telemetry.maybe_profile("app"):
+    st.title("Enterprise Strategic Direction — Interactive Decision Tree")
+    st.caption("Deep branching diagnostic (Direction → Driver/Type → Constraint/Pattern → Metrics → Outcomes).")
+
+    with span("tree_lookup"):
+        tree = session_tree()
+    restore_from_url(tree)
+
+    with st.sidebar:
+        st.header("Controls")
+        st.button("Reset all selections", on_click=reset)
+        st.divider()
+        search_panel(tree)
+
+    diagnostic_section(tree)
 
-st.caption("Tip: This app is a discovery tool. The next step is converting the summary into a roadmap, maturity score, and project portfolio.")
+    st.caption("Tip: This app is a discovery tool. The next step is converting the summary into a roadmap, maturity score, and project portfolio.")
@@ -0,0 +1,124 @@
+"""Request throughput of the HTTP API (``diagnostic.api``) on one core.
+
+Starts the server in a subprocess and drives it with keep-alive asyncio
+clients, one scenario at a time::
+
+    python benchmarks/bench_api.py --connections 32 --seconds 5
+
+Summaries go to a temporary store, not ``data/``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from diagnostic import load_tree  # noqa: E402
+from diagnostic.summary import choice_key  # noqa: E402
+
+
+def _request(method, target, headers=(), body=b""):
+    lines = [f"{method} {target} HTTP/1.1", "Host: bench", f"Content-Length: {len(body)}", *headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def _responses(tree, n, seed):
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(n):
+        path = tree.path_from_index(rng.randrange(tree.path_count()))
+        row = {choice_key(d): label for d, label in enumerate(tree.path_labels(path))}
+        metrics = tree.path_metrics(path)
+        row["selected_metrics_tracked"] = rng.sample(metrics, k=rng.randint(0, len(metrics)))
+        row["target_outcomes_12_18_months"] = rng.sample(tree.final_outcomes, k=rng.randint(1, 3))
+        row["success_statement"] = "Reduce cost-to-serve by 12%."
+        bodies.append(json.dumps(row).encode("utf-8"))
+    return bodies
+
+
+async def _client(port, requests, deadline, counts):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    while time.perf_counter() < deadline:
+        writer.write(requests[i % len(requests)])
+        i += 1
+        head = await reader.readuntil(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        if length:
+            await reader.readexactly(length)
+        counts[status] = counts.get(status, 0) + 1
+    writer.close()
+
+
+async def _scenario(port, requests, connections, seconds):
+    counts = {}
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(_client(port, requests, deadline, counts) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return {"requests": sum(counts.values()), "requests_per_s": sum(counts.values()) / elapsed, "status": counts}
+
+
+def _wait_for(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), 1))
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("API server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    tree = load_tree()
+    etag = f'"{tree.version}"'
+    bodies = _responses(tree, 500, args.seed)
+    scenarios = {
+        "tree_conditional": [_request("GET", "/tree", [f"If-None-Match: {etag}"])],
+        "tree_gzip": [_request("GET", "/tree", ["Accept-Encoding: gzip"])],
+        "summary": [_request("POST", "/summary", ["Content-Type: application/json"], b) for b in bodies],
+        "summaries_x100": [
+            _request("POST", "/summaries", ["Content-Type: application/json"],
+                     b"[" + b",".join(bodies[i:i + 100]) + b"]")
+            for i in range(0, len(bodies), 100)
+        ],
+    }
+
+    env = dict(os.environ, DIAGNOSTIC_STORE=os.path.join(tempfile.mkdtemp(prefix="bench-"), "summaries.sqlite3"))
+    server = subprocess.Popen([sys.executable, "-m", "diagnostic.api", "--port", str(args.port)], cwd=ROOT, env=env,
+                              stderr=subprocess.DEVNULL)
+    try:
+        _wait_for(args.port)
+        results = {
+            name: asyncio.run(_scenario(args.port, requests, args.connections, args.seconds))
+            for name, requests in scenarios.items()
+        }
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""Interaction latency, memory and concurrency benchmark for ``app.py``.
+
+Drives the app headlessly with Streamlit's ``AppTest`` through scripted
+sessions covering every path of the tree (or a sample of them) and records:
+
+* rerun latency per widget type (p50/p95/p99),
+* peak traced memory per session (in a second, traced pass),
+* rerun throughput with N concurrent sessions in one process.
+
+Results are written as JSON so runs can be compared::
+
+    python benchmarks/bench_app.py -o baseline.json
+    python benchmarks/bench_app.py -o after.json --compare baseline.json
+
+``--compare`` exits non-zero when any p95 latency regresses by more than
+``--tolerance`` (default 20%). Summaries written by the sessions go to a
+temporary store, not ``data/``.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DIAGNOSTIC_STORE", os.path.join(tempfile.mkdtemp(prefix="bench-"), "summaries.sqlite3"))
+
+import streamlit  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from diagnostic import load_tree  # noqa: E402
+
+APP = str(ROOT / "app.py")
+TIMEOUT = 30
+
+
+# -----------------------------
+# Scripted sessions
+# -----------------------------
+def _selection_key(depth):
+    return "sel_direction" if depth == 0 else f"sel_lvl{depth}"
+
+
+class Session:
+    """One simulated user; every ``step`` is a widget interaction plus a rerun."""
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+
+    def _timed(self, widget_type, action):
+        start = time.perf_counter()
+        action()
+        self.timings[widget_type].append(time.perf_counter() - start)
+        if self.at.exception:
+            raise RuntimeError(f"app raised during {widget_type}: {self.at.exception[0].value}")
+
+    def play(self, tree, path, rng):
+        at = self.at
+        self._timed("initial_load", at.run)
+
+        # Selection widgets hold option indices, so the path is played as is.
+        for depth, index in enumerate(path):
+            widget = at.radio(key=_selection_key(depth)) if depth == 0 else at.selectbox(key=_selection_key(depth))
+            kind = "radio" if depth == 0 else "selectbox"
+            self._timed(kind, lambda: widget.set_value(index).run())
+
+        n_metrics = len(tree.path_metrics(path))
+        for i in rng.sample(range(n_metrics), k=rng.randint(0, n_metrics)):
+            self._timed("checkbox", lambda: at.checkbox(key=f"chk_{i}").check().run())
+
+        self._timed("text_area", lambda: at.text_area(key="txt_notes").input("Baseline from last quarter's report.").run())
+        for outcome in rng.sample(range(len(tree.final_outcomes)), k=rng.randint(1, 3)):
+            self._timed("multiselect", lambda: at.multiselect(key="sel_outcomes").select(outcome).run())
+        self._timed("text_input", lambda: at.text_input(key="txt_success").input("Reduce cost-to-serve by 12%.").run())
+
+        reset = next(b for b in at.button if b.label == "Reset all selections")
+        self._timed("button", lambda: reset.click().run())
+
+
+def _paths(tree, max_paths, rng):
+    total = tree.path_count()
+    indices = range(total) if max_paths is None or max_paths >= total else sorted(rng.sample(range(total), max_paths))
+    return [tree.path_from_index(i) for i in indices]
+
+
+# -----------------------------
+# Measurements
+# -----------------------------
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": 1000 * sum(ordered) / len(ordered),
+        "p50_ms": 1000 * pick(0.50),
+        "p95_ms": 1000 * pick(0.95),
+        "p99_ms": 1000 * pick(0.99),
+    }
+
+
+def measure_latency(tree, paths, seed):
+    timings = defaultdict(list)
+    rng = random.Random(seed)
+    for path in paths:
+        Session(timings).play(tree, path, rng)
+    return {kind: percentiles(samples) for kind, samples in sorted(timings.items())}
+
+
+def measure_memory(tree, paths, seed):
+    # A separate pass: tracemalloc slows every allocation, so it must not
+    # overlap the latency samples. The same seed replays the same sessions.
+    peaks = []
+    rng = random.Random(seed)
+    tracemalloc.start()
+    for path in paths:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        session = Session(defaultdict(list))
+        session.play(tree, path, rng)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        del session
+    tracemalloc.stop()
+
+    peaks.sort()
+    return {
+        "sessions": len(peaks),
+        "peak_kib_p50": peaks[len(peaks) // 2] / 1024,
+        "peak_kib_max": peaks[-1] / 1024,
+    }
+
+
+def measure_throughput(tree, paths, n_sessions, seed):
+    timings = defaultdict(list)
+    lock = threading.Lock()
+    errors = []
+
+    def worker(worker_id):
+        rng = random.Random(seed + worker_id)
+        local = defaultdict(list)
+        try:
+            for path in paths[worker_id::n_sessions] or paths[:1]:
+                Session(local).play(tree, path, rng)
+        except Exception as exc:  # surfaced after the run
+            errors.append(exc)
+        with lock:
+            for kind, samples in local.items():
+                timings[kind].extend(samples)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+
+    reruns = sum(len(s) for s in timings.values())
+    everything = [x for s in timings.values() for x in s]
+    return {
+        "sessions": n_sessions,
+        "reruns": reruns,
+        "seconds": elapsed,
+        "reruns_per_s": reruns / elapsed,
+        "latency": percentiles(everything),
+    }
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, tolerance):
+    regressions = []
+    for kind, stats in current["latency"].items():
+        base = baseline.get("latency", {}).get(kind)
+        if not base:
+            continue
+        change = stats["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        line = f"{kind:>14}: p95 {base['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f} ms ({change:+.1%})"
+        print(line, file=sys.stderr)
+        if change > tolerance:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--max-paths", type=int, help="sample this many paths instead of all of them")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 16], help="concurrent session counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", help="baseline JSON to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.20)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    tree = load_tree()
+    paths = _paths(tree, args.max_paths, rng)
+
+    latency = measure_latency(tree, paths, args.seed)
+    memory = measure_memory(tree, paths, args.seed)
+    throughput = [measure_throughput(tree, paths, n, args.seed) for n in args.concurrency]
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "tree_version": tree.version,
+            "paths": len(paths),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "latency": latency,
+        "memory": memory,
+        "throughput": throughput,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
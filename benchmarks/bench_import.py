@@ -0,0 +1,68 @@
+"""Cold import and first-use time of the engine, without Streamlit.
+
+Every scenario runs in a fresh interpreter (``-S``, so site packages do not
+count) and is repeated; the median is reported::
+
+    python benchmarks/bench_import.py --runs 20 --budget-ms 50
+
+``--budget-ms`` exits non-zero when a scenario's median exceeds it.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "import_package": "import diagnostic",
+    "engine_names": "import diagnostic; diagnostic.load_tree; diagnostic.build_summary; diagnostic.validate_definition",
+    "load_and_summarize": (
+        "import diagnostic\n"
+        "tree = diagnostic.load_tree()\n"
+        "diagnostic.build_summary(tree, tree.path_from_index(0))"
+    ),
+    "batch_module": "import diagnostic.batch",
+}
+
+PROBE = """
+import time
+start = time.perf_counter()
+exec(compile({code!r}, "<scenario>", "exec"))
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def measure(code, runs):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-S", "-c", PROBE.format(code=code)], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        times.append(float(out))
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, help="fail when a median exceeds this many milliseconds")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, code in SCENARIOS.items():
+        times = measure(code, args.runs)
+        results[name] = {"median_ms": round(statistics.median(times), 2), "max_ms": round(max(times), 2)}
+    print(json.dumps(results, indent=2))
+    if args.budget_ms is not None:
+        over = [name for name, r in results.items() if r["median_ms"] > args.budget_ms]
+        if over:
+            print(f"over the {args.budget_ms:g} ms budget: {', '.join(over)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""Tree model, validation and summary construction, free of Streamlit.
+
+Importing the package has no side effects and loads nothing up front: each
+name below is imported from its module on first access, so batch jobs and
+workers only pay for what they use. ``python -m diagnostic`` validates tree
+definitions and evaluates paths.
+"""
+from importlib import import_module
+
+_EXPORTS = {
+    "CompiledTree": ".compiled",
+    "TreeError": ".loader",
+    "build_summary": ".summary",
+    "compile_tree": ".compiled",
+    "load_tree": ".loader",
+    "now_iso": ".summary",
+    "validate_definition": ".loader",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,111 @@
+"""Command line for tree definitions, without Streamlit.
+
+::
+
+    python -m diagnostic validate trees/default.json trees/acme.yaml
+    python -m diagnostic evaluate "Operational Excellence" "Cost / Efficiency" \\
+        "Rework / repeat handling" "No standard work / unclear SOPs" \\
+        --track "Unit cost per transaction (before/after)" --outcome "Financial (EBITDA, margin, cost-to-serve)"
+
+``validate`` checks, compiles and summarizes each definition (exit status 2
+if any is invalid). ``evaluate`` walks a path of option labels and prints its
+summary JSON as the app would export it; an incomplete path lists the options
+of the next question instead.
+"""
+import argparse
+import json
+import os
+import sys
+
+from .loader import DEFAULT_TREE_PATH, TreeError, compile_definition, parse_definition
+from .summary import choice_key, now_iso
+
+
+def validate(path):
+    """Compile the definition at ``path`` and return a one-line description of it."""
+    if os.path.isdir(path):
+        from .lazy import LazyTree
+
+        tree = LazyTree(path)
+        kind = "packed"
+    else:
+        with open(path, "rb") as f:
+            tree = compile_definition(parse_definition(f.read(), path))
+        kind = f"{len(tree)} nodes"
+    return f"{kind}, {tree.path_count()} paths, depth {tree.depth}, {len(tree.final_outcomes)} final outcomes"
+
+
+def cmd_validate(args):
+    failed = 0
+    for path in args.trees:
+        try:
+            print(f"{path}: ok, {validate(path)}")
+        except (TreeError, ValueError, OSError) as exc:
+            # Parse errors already name the file.
+            message = str(exc)
+            print(message if message.startswith(path) else f"{path}: {message}", file=sys.stderr)
+            failed += 1
+    return 2 if failed else 0
+
+
+def cmd_evaluate(args):
+    from .batch import ResponseError, evaluate
+    from .loader import load_tree
+
+    try:
+        tree = load_tree(args.tree)
+    except (TreeError, OSError) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    try:
+        path = tree.path_for_labels(args.labels)
+    except (KeyError, IndexError):
+        print(f"unknown path {args.labels}", file=sys.stderr)
+        return 1
+    nid = tree.resolve(path)
+    if not tree.is_leaf(nid):
+        print(f"incomplete path; next: {tree.question(nid)}", file=sys.stderr)
+        for option in tree.options(nid):
+            print(f"  {option}", file=sys.stderr)
+        return 1
+
+    row = {choice_key(depth): label for depth, label in enumerate(args.labels)}
+    row.update({
+        "timestamp_utc": now_iso(),
+        "selected_metrics_tracked": args.track,
+        "notes": args.notes,
+        "target_outcomes_12_18_months": args.outcome,
+        "success_statement": args.success,
+    })
+    try:
+        summary = next(evaluate([row], tree))
+    except ResponseError as exc:
+        print(exc.message, file=sys.stderr)
+        return 1
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m diagnostic", description="Validate trees and evaluate paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    check = commands.add_parser("validate", help="check tree definitions (.json/.yaml or packed dirs)")
+    check.add_argument("trees", nargs="+", metavar="TREE")
+    check.set_defaults(run=cmd_validate)
+
+    walk = commands.add_parser("evaluate", help="print the summary of a path of option labels")
+    walk.add_argument("labels", nargs="+", metavar="LABEL", help="one option label per level, from the direction")
+    walk.add_argument("--tree", default=DEFAULT_TREE_PATH)
+    walk.add_argument("--track", action="append", default=[], metavar="METRIC", help="a tracked metric; repeatable")
+    walk.add_argument("--outcome", action="append", default=[], help="a targeted final outcome; repeatable")
+    walk.add_argument("--notes", default="")
+    walk.add_argument("--success", default="", help="success statement")
+    walk.set_defaults(run=cmd_evaluate)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Aggregate views over the rollup tables maintained by ``diagnostic.store``.
+
+Rollups are keyed by tenant, tree version and compiled ids, so every query here reads
+at most one row per distinct path, metric or outcome, regardless of how many
+summaries have been stored.
+"""
+import math
+from collections import Counter
+
+from .store import DEFAULT_TENANT, cohort_node, idempotency_key
+
+
+class Rollups:
+    def __init__(self, paths, metrics, outcomes):
+        self.paths = paths
+        self.metrics = metrics
+        self.outcomes = outcomes
+
+    @property
+    def total(self):
+        return sum(self.paths.values())
+
+
+def load_rollups(store, version, tenant=DEFAULT_TENANT):
+    key = (tenant, version)
+    with store.connection() as conn:
+        paths = dict(conn.execute(
+            "SELECT path_index, count FROM path_counts WHERE tenant = ? AND tree_version = ?", key
+        ))
+        metrics = {
+            (node, metric): count
+            for node, metric, count in conn.execute(
+                "SELECT node, metric, count FROM metric_counts WHERE tenant = ? AND tree_version = ?", key
+            )
+        }
+        outcomes = dict(conn.execute(
+            "SELECT outcome, count FROM outcome_counts WHERE tenant = ? AND tree_version = ?", key
+        ))
+    return Rollups(paths, metrics, outcomes)
+
+
+class Cohort:
+    """Peers sharing a path's direction and level 1 choice in one workshop.
+
+    ``coverage`` maps a number of tracked metrics to how many peers tracked
+    that many; the domain is bounded by the recommended metrics, so the
+    histogram is an exact quantile sketch. ``levers`` counts final choices.
+    """
+
+    def __init__(self, coverage, levers):
+        self.coverage = coverage
+        self.levers = levers
+
+    @property
+    def total(self):
+        return sum(self.coverage.values())
+
+    def quantile(self, q):
+        """Nearest-rank ``q`` quantile of tracked metric counts, ``None`` for an empty cohort."""
+        total = self.total
+        if not total:
+            return None
+        rank = max(1, math.ceil(q * total))
+        seen = 0
+        for tracked in sorted(self.coverage):
+            seen += self.coverage[tracked]
+            if seen >= rank:
+                return tracked
+        return tracked
+
+    def lever_shares(self, tree):
+        """``(label, share)`` of each final choice among the cohort, most frequent first."""
+        total = sum(self.levers.values())
+        return [(tree.label(node), n / total) for node, n in Counter(self.levers).most_common()]
+
+
+def load_cohort(store, tree, path, workshop=None, session_id=None, tenant=DEFAULT_TENANT):
+    """The cohort of ``path`` in ``workshop``, leaving out the stored record of ``session_id``."""
+    key = (tenant, tree.version, workshop or "", cohort_node(tree, path))
+    match = "tenant = ? AND tree_version = ? AND workshop = ? AND cohort = ?"
+    with store.connection() as conn:
+        coverage = Counter(dict(conn.execute(f"SELECT tracked, count FROM cohort_coverage WHERE {match}", key)))
+        levers = Counter(dict(conn.execute(f"SELECT lever, count FROM cohort_levers WHERE {match}", key)))
+        own = None
+        if session_id is not None:
+            own = conn.execute(
+                "SELECT workshop, cohort, lever, metrics_mask FROM summaries WHERE idem_key = ?",
+                (idempotency_key(None, session_id, tree.version, tenant),),
+            ).fetchone()
+    if own is not None and ((own[0] or ""), own[1]) == key[2:]:
+        coverage[bin(own[3]).count("1")] -= 1
+        levers[own[2]] -= 1
+    return Cohort(+coverage, +levers)
+
+
+def stored_versions(store, tenant=DEFAULT_TENANT):
+    with store.connection() as conn:
+        return [v for (v,) in conn.execute(
+            "SELECT tree_version FROM path_counts WHERE tenant = ? GROUP BY tree_version ORDER BY SUM(count) DESC",
+            (tenant,),
+        )]
+
+
+def path_breakdown(tree, rollups, depth):
+    """Submissions per path prefix of ``depth`` levels, most frequent first."""
+    counts = Counter()
+    for path_index, n in rollups.paths.items():
+        labels = tree.path_labels(tree.path_from_index(path_index)[:depth])
+        counts[tuple(labels)] += n
+    return counts.most_common()
+
+
+def metric_usage(tree, rollups):
+    """How often each recommended metric is tracked, relative to how often it was offered."""
+    offered = Counter()
+    for path_index, n in rollups.paths.items():
+        node = tree.path_metrics_node(tree.path_from_index(path_index))
+        if node is not None:
+            offered[node] += n
+
+    rows = []
+    for node, n_offered in offered.items():
+        for i, metric in enumerate(tree.metrics(node)):
+            tracked = rollups.metrics.get((node, i), 0)
+            rows.append({
+                "node": tree.label(node),
+                "metric": metric,
+                "tracked": tracked,
+                "offered": n_offered,
+                "rate": tracked / n_offered,
+            })
+    rows.sort(key=lambda r: (-r["tracked"], r["node"], r["metric"]))
+    return rows
+
+
+def top_outcomes(tree, rollups, n=None):
+    counts = Counter({tree.final_outcomes[i]: c for i, c in rollups.outcomes.items() if i < len(tree.final_outcomes)})
+    return counts.most_common(n)
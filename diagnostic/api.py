@@ -0,0 +1,330 @@
+"""Standalone HTTP API for integrations that cannot drive the Streamlit app.
+
+::
+
+    python -m diagnostic.api --port 8080
+
+``GET /tree``
+    the loaded tree as JSON (see ``compiled.tree_payload``). The ETag is the
+    tree version, so ``If-None-Match`` revalidation answers ``304`` without a
+    body; gzip is used when the client accepts it.
+``POST /summary``
+    one response with the same fields as a ``diagnostic.batch`` row; returns
+    its ``summary`` or ``422`` with the validation error.
+``POST /summaries``
+    a JSON array of responses; returns ``{"summaries": [...], "errors": [...]}``
+    with one error per rejected row.
+``GET /metrics``
+    the Prometheus metrics of this process.
+
+Complete summaries are queued to the summary store like the app's, one
+record per submission: a response's ``submission_id`` field or, failing
+that, the request's ``Idempotency-Key`` header (numbered by row for
+``/summaries``) identifies it, and posting the same id again replaces the
+record. Responses without either are each stored on their own. The server
+is a single asyncio loop speaking HTTP/1.1 with keep-alive and uses only the
+standard library; tree bodies are serialized once per tree version.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+
+from . import telemetry
+from .batch import ResponseError, UnreadableRow, evaluate
+from .compiled import tree_payload
+from .loader import DEFAULT_TREE_PATH, TreeError, load_tree
+from .store import get_store, is_complete
+from .summary import choice_key, now_iso
+
+MAX_BODY = 8 * 1024 * 1024
+MAX_BATCH = 10_000
+HEADER_LIMIT = 64 * 1024
+KEEP_BODIES = 4
+
+REASONS = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error",
+}
+JSON_TYPE = "application/json; charset=utf-8"
+
+log = logging.getLogger(__name__)
+
+API_REQUESTS = telemetry.Counter(
+    "diagnostic_api_requests_total", "HTTP API requests by route and status.", ("route", "status")
+)
+telemetry.REGISTRY.append(API_REQUESTS)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.headers = tuple(headers)
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class _TreeBody:
+    __slots__ = ("etag", "raw", "gzipped")
+
+    def __init__(self, tree):
+        self.etag = f'"{tree.version}"'
+        self.raw = _json(tree_payload(tree))
+        self.gzipped = gzip.compress(self.raw, 6)
+
+
+_lock = threading.Lock()
+_bodies = OrderedDict()
+
+
+def tree_body(tree):
+    with _lock:
+        body = _bodies.get(tree.version)
+        if body is not None:
+            return body
+    body = _TreeBody(tree)
+    with _lock:
+        body = _bodies.setdefault(tree.version, body)
+        while len(_bodies) > KEEP_BODIES:
+            _bodies.popitem(last=False)
+    return body
+
+
+def submission_ids(rows):
+    """The store key of each row: its ``submission_id``, or a fresh one.
+
+    A row with an invalid id is replaced by an ``UnreadableRow``, so
+    evaluation rejects it with its row number like any other invalid row.
+    """
+    ids = []
+    for i, row in enumerate(rows):
+        id_ = row.get("submission_id")
+        if id_ is not None and (not isinstance(id_, str) or not id_):
+            rows[i] = UnreadableRow("submission_id must be a non-empty string")
+            id_ = None
+        ids.append(id_ or uuid.uuid4().hex)
+    return ids
+
+
+def _etag_matches(header, etag):
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class DiagnosticAPI:
+    def __init__(self, tree_path=DEFAULT_TREE_PATH, store=None, persist=True):
+        self.tree_path = tree_path
+        self.persist = persist
+        self._store = store
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = get_store()
+        return self._store
+
+    # -----------------------------
+    # Routes
+    # -----------------------------
+    def get_tree(self, headers):
+        body = tree_body(load_tree(self.tree_path))
+        cache = [("ETag", body.etag), ("Cache-Control", "no-cache")]
+        if _etag_matches(headers.get("if-none-match", ""), body.etag):
+            return 304, cache, b""
+        if "gzip" in headers.get("accept-encoding", ""):
+            return 200, cache + [("Content-Type", JSON_TYPE), ("Content-Encoding", "gzip"),
+                                 ("Vary", "Accept-Encoding")], body.gzipped
+        return 200, cache + [("Content-Type", JSON_TYPE), ("Vary", "Accept-Encoding")], body.raw
+
+    def evaluate(self, rows, errors=None):
+        tree = load_tree(self.tree_path)
+        now = now_iso()
+        for row in rows:
+            row.setdefault("timestamp_utc", now)
+        ids = submission_ids(rows)
+        summaries = list(evaluate(rows, tree, errors))
+        if self.persist:
+            # Rejected rows yield no summary; the rest keep their order.
+            rejected = {exc.row for exc in errors or ()}
+            accepted = [id_ for row_no, id_ in enumerate(ids, start=1) if row_no not in rejected]
+            for summary, id_ in zip(summaries, accepted):
+                if is_complete(summary):
+                    labels = []
+                    while summary.get(choice_key(len(labels))):
+                        labels.append(summary[choice_key(len(labels))])
+                    self.store.submit(summary, session_id=id_, tree=tree, path=tree.path_for_labels(labels))
+        return summaries
+
+    def post_summary(self, body, headers=None):
+        row = _parse(body)
+        if not isinstance(row, dict):
+            raise HTTPError(400, "expected a JSON object")
+        key = (headers or {}).get("idempotency-key")
+        if key:
+            row.setdefault("submission_id", key)
+        try:
+            (summary,) = self.evaluate([row])
+        except ResponseError as exc:
+            raise HTTPError(422, exc.message) from exc
+        return 200, [("Content-Type", JSON_TYPE)], _json(summary)
+
+    def post_summaries(self, body, headers=None):
+        rows = _parse(body)
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise HTTPError(400, "expected a JSON array of objects")
+        if len(rows) > MAX_BATCH:
+            raise HTTPError(413, f"at most {MAX_BATCH} responses per batch")
+        key = (headers or {}).get("idempotency-key")
+        if key:
+            for row_no, row in enumerate(rows, start=1):
+                row.setdefault("submission_id", f"{key}/{row_no}")
+        errors = []
+        summaries = self.evaluate(rows, errors)
+        result = {
+            "summaries": summaries,
+            "errors": [{"row": exc.row, "error": exc.message} for exc in errors],
+        }
+        return 200, [("Content-Type", JSON_TYPE)], _json(result)
+
+    def dispatch(self, method, target, headers, body):
+        route = target.split("?", 1)[0]
+        if route == "/tree":
+            if method != "GET":
+                raise HTTPError(405, "use GET", [("Allow", "GET")])
+            return self.get_tree(headers)
+        if route in ("/summary", "/summaries"):
+            if method != "POST":
+                raise HTTPError(405, "use POST", [("Allow", "POST")])
+            if route == "/summary":
+                return self.post_summary(body, headers)
+            return self.post_summaries(body, headers)
+        if route == "/metrics" and method == "GET":
+            return 200, [("Content-Type", "text/plain; version=0.0.4; charset=utf-8")], \
+                telemetry.render_prometheus().encode("utf-8")
+        raise HTTPError(404, f"no route for {route}")
+
+    def respond(self, method, target, headers, body):
+        route = target.split("?", 1)[0]
+        try:
+            status, extra, payload = self.dispatch(method, target, headers, body)
+        except HTTPError as exc:
+            status, extra, payload = exc.status, list(exc.headers), _json({"error": str(exc)})
+            extra.append(("Content-Type", JSON_TYPE))
+        except TreeError as exc:
+            log.error("tree failed to load: %s", exc)
+            status, extra, payload = 500, [("Content-Type", JSON_TYPE)], _json({"error": "tree unavailable"})
+        except Exception:
+            log.exception("%s %s failed", method, route)
+            status, extra, payload = 500, [("Content-Type", JSON_TYPE)], _json({"error": "internal error"})
+        API_REQUESTS.inc(route if route in ("/tree", "/summary", "/summaries", "/metrics") else "other", status)
+        return status, extra, payload
+
+    # -----------------------------
+    # HTTP/1.1
+    # -----------------------------
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(_response(400, [], _json({"error": "headers too large"}), False))
+                    break
+                try:
+                    method, target, version, headers = _parse_head(head)
+                except ValueError:
+                    writer.write(_response(400, [], _json({"error": "malformed request"}), False))
+                    break
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                if "transfer-encoding" in headers:
+                    writer.write(_response(411, [], _json({"error": "send a Content-Length"}), False))
+                    break
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY:
+                    writer.write(_response(413, [], _json({"error": f"body limit is {MAX_BODY} bytes"}), False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, extra, payload = self.respond(method, target, headers, body)
+                writer.write(_response(status, extra, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.handle, host, port, limit=HEADER_LIMIT)
+        async with server:
+            await server.serve_forever()
+
+
+def _parse(body):
+    try:
+        return json.loads(body)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPError(400, f"invalid JSON: {exc}") from exc
+
+
+def _parse_head(head):
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, version = lines[0].split(" ")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise ValueError(line)
+            headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+def _response(status, headers, body, keep_alive):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines.extend(f"{name}: {value}" for name, value in headers)
+    lines.append(f"Content-Length: {len(body)}")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the diagnostic tree and evaluate submissions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--tree", default=DEFAULT_TREE_PATH, help="tree definition (.json/.yaml or packed dir)")
+    parser.add_argument("--no-store", action="store_true", help="evaluate submissions without storing them")
+    args = parser.parse_args(argv)
+
+    try:
+        load_tree(args.tree)
+    except TreeError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    logging.basicConfig(level=logging.INFO)
+    api = DiagnosticAPI(args.tree, persist=not args.no_store)
+    log.info("serving on http://%s:%d", args.host, args.port)
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""Headless batch evaluation of diagnostic responses.
+
+Reads responses from CSV or JSONL and produces the same ``summary`` records as
+the Streamlit app, without importing Streamlit::
+
+    python -m diagnostic.batch responses.csv -o summaries.jsonl
+
+Rows are processed in chunks. Each distinct path in a chunk is resolved
+against the compiled tree once; its summary template and metric set come from
+the shared path catalog, and every row on that path reuses the cached lookup.
+"""
+import argparse
+import csv
+import json
+import sys
+from itertools import islice
+
+from .catalog import get_catalog
+from .loader import DEFAULT_TREE_PATH, TreeError, load_tree
+from .summary import choice_key
+
+LIST_SEPARATOR = "|"
+CHUNK_SIZE = 10_000
+
+LIST_FIELDS = ("selected_metrics_tracked", "target_outcomes_12_18_months")
+TEXT_FIELDS = ("timestamp_utc", "notes", "success_statement")
+MAX_OUTCOMES = 3
+
+
+class ResponseError(ValueError):
+    def __init__(self, row, message):
+        super().__init__(f"row {row}: {message}")
+        self.row = row
+        self.message = message
+
+
+# -----------------------------
+# Input
+# -----------------------------
+class UnreadableRow:
+    """Stands in for an input line that could not be parsed; ``evaluate`` rejects it."""
+
+    __slots__ = ("message",)
+
+    def __init__(self, message):
+        self.message = message
+
+def _split_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    value = value.strip()
+    if not value:
+        return []
+    if value.startswith("["):
+        return json.loads(value)
+    return [v.strip() for v in value.split(LIST_SEPARATOR) if v.strip()]
+
+
+def read_responses(path):
+    """Yield response dicts from a ``.csv`` or ``.jsonl`` file.
+
+    Lines that do not parse are yielded as ``UnreadableRow`` so they are
+    reported with their row number like any other invalid response.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                try:
+                    for field in LIST_FIELDS:
+                        row[field] = _split_list(row.get(field))
+                except ValueError as exc:
+                    yield UnreadableRow(f"{field}: invalid list: {exc}")
+                    continue
+                yield row
+        else:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as exc:
+                        yield UnreadableRow(f"invalid JSON: {exc}")
+
+
+# -----------------------------
+# Evaluation
+# -----------------------------
+class _PathCache:
+    def __init__(self, tree):
+        self.tree = tree
+        self.entries = {}
+
+    def labels(self, row_no, row):
+        # Trees can have any depth; a path is every consecutive level present.
+        labels = []
+        while True:
+            key = choice_key(len(labels))
+            label = row.get(key)
+            if not label:
+                return tuple(labels)
+            if not isinstance(label, str):
+                raise ResponseError(row_no, f"{key} must be a string")
+            labels.append(label)
+
+    def lookup(self, labels):
+        entry = self.entries.get(labels)
+        if entry is None:
+            path = self.tree.path_for_labels(labels)
+            static = get_catalog(self.tree).entry(path)
+            entry = (path, static.template, static.recommended)
+            self.entries[labels] = entry
+        return entry
+
+
+def _check_fields(row_no, row):
+    if isinstance(row, UnreadableRow):
+        raise ResponseError(row_no, row.message)
+    if not isinstance(row, dict):
+        raise ResponseError(row_no, "expected an object")
+    for field in TEXT_FIELDS:
+        if not isinstance(row.get(field) or "", str):
+            raise ResponseError(row_no, f"{field} must be a string")
+    for field in LIST_FIELDS:
+        values = row.get(field) or []
+        if not isinstance(values, (list, tuple)) or not all(isinstance(v, str) for v in values):
+            raise ResponseError(row_no, f"{field} must be a list of strings")
+
+
+def _evaluate_chunk(chunk, cache, outcome_index, errors):
+    # Malformed rows keep their error in place of a path, so every row is
+    # still reported in order below.
+    paths = []
+    for row_no, row in chunk:
+        try:
+            _check_fields(row_no, row)
+            paths.append(cache.labels(row_no, row))
+        except ResponseError as exc:
+            paths.append(exc)
+
+    resolved = {}
+    for labels in {labels for labels in paths if not isinstance(labels, ResponseError)}:
+        try:
+            resolved[labels] = cache.lookup(labels)
+        except (KeyError, IndexError):
+            resolved[labels] = None
+
+    for (row_no, row), labels in zip(chunk, paths):
+        try:
+            if isinstance(labels, ResponseError):
+                raise labels
+            entry = resolved[labels]
+            if entry is None:
+                raise ResponseError(row_no, f"unknown path {list(labels)}")
+            _, template, recommended = entry
+
+            tracked = set(row.get("selected_metrics_tracked") or ())
+            unknown = tracked - recommended
+            if unknown:
+                raise ResponseError(row_no, f"metrics not recommended for this path: {sorted(unknown)}")
+
+            outcomes = list(row.get("target_outcomes_12_18_months") or ())
+            bad = [o for o in outcomes if o not in outcome_index]
+            if bad:
+                raise ResponseError(row_no, f"unknown outcomes: {bad}")
+            if len(outcomes) > MAX_OUTCOMES:
+                raise ResponseError(row_no, f"at most {MAX_OUTCOMES} outcomes allowed")
+        except ResponseError as exc:
+            if errors is None:
+                raise
+            errors.append(exc)
+            continue
+
+        summary = dict(template)
+        summary["timestamp_utc"] = row.get("timestamp_utc") or ""
+        summary["selected_metrics_tracked"] = [m for m in template["recommended_metrics"] if m in tracked]
+        summary["notes"] = row.get("notes") or ""
+        summary["target_outcomes_12_18_months"] = outcomes
+        summary["success_statement"] = row.get("success_statement") or ""
+        yield summary
+
+
+def evaluate(rows, tree, errors=None, chunk_size=CHUNK_SIZE):
+    """Yield a summary per valid row of ``rows``.
+
+    Invalid rows raise ``ResponseError`` unless an ``errors`` list is given,
+    in which case they are appended to it and skipped.
+    """
+    cache = _PathCache(tree)
+    numbered = enumerate(rows, start=1)
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield from _evaluate_chunk(chunk, cache, tree.outcome_index, errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate diagnostic responses into summary records.")
+    parser.add_argument("input", help="responses as .csv or .jsonl")
+    parser.add_argument("-o", "--output", help="summaries .jsonl (default: stdout)")
+    parser.add_argument("--tree", default=DEFAULT_TREE_PATH, help="tree definition (.json/.yaml)")
+    parser.add_argument("--strict", action="store_true", help="stop at the first invalid row")
+    args = parser.parse_args(argv)
+
+    try:
+        tree = load_tree(args.tree)
+    except TreeError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    errors = None if args.strict else []
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    count = 0
+    try:
+        for summary in evaluate(read_responses(args.input), tree, errors):
+            out.write(json.dumps(summary, ensure_ascii=False) + "\n")
+            count += 1
+    except ResponseError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    for exc in errors or ():
+        print(exc, file=sys.stderr)
+    print(f"{count} summaries written, {len(errors or ())} rows rejected", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Per-path catalog of the static parts of a summary.
+
+Everything about a summary except the user's input depends only on the path:
+the choices, the outcome text, the recommended metrics, the "What we learned"
+block and most of the JSON export. ``PathCatalog`` computes these once per
+path and keys them by the dense ``path_index``; a session then only merges its
+own metrics, notes and outcomes into the cached template.
+
+Trees with at most ``MAX_ENTRIES`` paths are enumerated up front when the
+catalog is built. Larger (typically lazily loaded) trees fill the catalog on
+demand and keep the ``MAX_ENTRIES`` most recently used paths.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from .summary import build_summary, choice_key, level_name, now_iso
+
+MAX_ENTRIES = 10_000
+KEEP_CATALOGS = 8
+
+_DYNAMIC_KEYS = ("selected_metrics_tracked", "notes", "target_outcomes_12_18_months", "success_statement")
+
+
+class PathEntry:
+    """Static parts of the summary for one complete path.
+
+    ``template`` is a summary with an empty timestamp and no user input; it is
+    shared, so copy it before filling it in.
+    """
+
+    __slots__ = ("path", "template", "recommended", "outcome", "learned", "json_static")
+
+    def __init__(self, tree, path):
+        self.path = path
+        self.template = build_summary(tree, path, timestamp="")
+        self.recommended = frozenset(self.template["recommended_metrics"])
+        self.outcome = tree.outcome(tree.resolve(path))
+        self.learned = "  \n".join(
+            f"**{level_name(depth)}:** {self.template[choice_key(depth)]}" for depth in range(len(path))
+        )
+        # The export is ``json.dumps(summary, indent=2)``; everything between
+        # the timestamp and the user's input is serialized once here.
+        static = {k: v for k, v in self.template.items() if k != "timestamp_utc" and k not in _DYNAMIC_KEYS}
+        self.json_static = json.dumps(static, indent=2)[2:-2]
+
+
+class PathCatalog:
+    def __init__(self, tree, max_entries=MAX_ENTRIES):
+        self.tree = tree
+        self.version = tree.version
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.complete = tree.path_count() <= max_entries
+        if self.complete:
+            self._enumerate(tree.root, ())
+
+    def _enumerate(self, nid, path):
+        tree = self.tree
+        if tree.is_leaf(nid):
+            self._entries[tree.path_index(path)] = PathEntry(tree, path)
+            return
+        for i in range(tree.n_children(nid)):
+            self._enumerate(tree.child(nid, i), path + (i,))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entry(self, path):
+        """Return the ``PathEntry`` for a complete ``path``; raise ``KeyError`` if it is not one."""
+        path = tuple(path)
+        if not self.tree.is_leaf(self.tree.resolve(path)):
+            raise KeyError(path)
+        key = self.tree.path_index(path)
+        if self.complete:
+            return self._entries[key]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = PathEntry(self.tree, path)
+        with self._lock:
+            entry = self._entries.setdefault(key, entry)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def summary(self, path, tracked_metrics=(), notes="", outcomes=(), success="", timestamp=None):
+        """Same as ``build_summary`` but filled in from the cached template."""
+        entry = self.entry(path)
+        tracked = set(tracked_metrics)
+        summary = dict(entry.template)
+        summary["timestamp_utc"] = timestamp or now_iso()
+        summary["selected_metrics_tracked"] = [m for m in entry.template["recommended_metrics"] if m in tracked]
+        summary["notes"] = notes
+        summary["target_outcomes_12_18_months"] = list(outcomes)
+        summary["success_statement"] = success
+        return summary
+
+    def summary_json(self, path, summary):
+        """Return ``json.dumps(summary, indent=2)``, serializing only the per-session fields."""
+        head = json.dumps({"timestamp_utc": summary["timestamp_utc"]}, indent=2)[:-2]
+        tail = json.dumps({k: summary[k] for k in _DYNAMIC_KEYS}, indent=2)[2:]
+        return f"{head},\n{self.entry(path).json_static},\n{tail}"
+
+
+_lock = threading.Lock()
+_catalogs = OrderedDict()
+
+
+def get_catalog(tree):
+    """Return the shared catalog for ``tree``'s version, building it on first use."""
+    key = tree.version if tree.version is not None else id(tree)
+    with _lock:
+        catalog = _catalogs.get(key)
+        if catalog is not None:
+            _catalogs.move_to_end(key)
+            return catalog
+    catalog = PathCatalog(tree)
+    with _lock:
+        catalog = _catalogs.setdefault(key, catalog)
+        while len(_catalogs) > KEEP_CATALOGS:
+            _catalogs.popitem(last=False)
+    return catalog
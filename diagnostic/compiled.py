@@ -0,0 +1,383 @@
+"""Compact, integer-indexed representation of the decision tree.
+
+Every node, option and metric gets an integer id. Node attributes live in
+parallel ``array('i')`` columns, children of a node occupy a contiguous range
+of one flat ``children`` array, and all text is interned once into a string
+table. A selection path is a tuple of child indices (one per level) and
+resolves with a handful of array reads.
+"""
+import sys
+from array import array
+from bisect import bisect_right
+
+ROOT_QUESTION = "Q1. On which direction is the company moving?"
+
+NO_TEXT = -1
+
+
+class TreeBase:
+    """Path operations shared by every tree representation.
+
+    Subclasses provide the node accessors (``label``, ``question``,
+    ``outcome``, ``metrics``, ``has_metrics``, ``is_leaf``, ``n_children``,
+    ``child``, ``options``, ``child_index``, ``path_count`` and
+    ``child_offsets``); paths are tuples of child indices from ``root``.
+    """
+
+    root = 0
+    depth = 0  # choices on the longest path
+    version = None
+    source = None
+    final_outcomes = ()
+    outcome_index = {}
+
+    def path_nodes(self, path):
+        nodes = []
+        nid = self.root
+        for index in path:
+            nid = self.child(nid, index)
+            nodes.append(nid)
+        return nodes
+
+    def resolve(self, path):
+        nid = self.root
+        for index in path:
+            nid = self.child(nid, index)
+        return nid
+
+    def path_labels(self, path):
+        return [self.label(nid) for nid in self.path_nodes(path)]
+
+    def path_for_labels(self, labels):
+        path = []
+        nid = self.root
+        for label in labels:
+            index = self.child_index(nid, label)
+            path.append(index)
+            nid = self.child(nid, index)
+        return tuple(path)
+
+    def path_metrics_node(self, path):
+        """Deepest node on ``path`` that defines metrics, or ``None``."""
+        for nid in reversed(self.path_nodes(path)):
+            if self.has_metrics(nid):
+                return nid
+        return None
+
+    def path_metrics(self, path):
+        nid = self.path_metrics_node(path)
+        return [] if nid is None else self.metrics(nid)
+
+    def path_index(self, path):
+        """Dense id in ``range(path_count())`` for a complete root-to-leaf path.
+
+        Paths sharing a prefix occupy one contiguous id range.
+        """
+        nid, index = self.root, 0
+        for i in path:
+            child = self.child(nid, i)
+            index += self.child_offsets(nid)[i]
+            nid = child
+        if not self.is_leaf(nid):
+            raise ValueError("path does not end at a leaf")
+        return index
+
+    def path_range(self, prefix):
+        """The ``range`` of dense path ids of every complete path starting with ``prefix``."""
+        nid, start = self.root, 0
+        for i in prefix:
+            child = self.child(nid, i)
+            start += self.child_offsets(nid)[i]
+            nid = child
+        return range(start, start + self.path_count(nid))
+
+    def path_from_index(self, index):
+        if not 0 <= index < self.path_count(self.root):
+            raise IndexError(index)
+        path = []
+        nid = self.root
+        while not self.is_leaf(nid):
+            offsets = self.child_offsets(nid)
+            i = bisect_right(offsets, index) - 1
+            index -= offsets[i]
+            path.append(i)
+            nid = self.child(nid, i)
+        return tuple(path)
+
+
+class CompiledTree(TreeBase):
+    def __init__(self):
+        self.strings = []
+        self._string_ids = {}
+
+        # node columns
+        self._label = array("i")
+        self._question = array("i")
+        self._outcome = array("i")
+        self._metric_start = array("i")
+        self._metric_end = array("i")
+        self._child_start = array("i")
+        self._child_end = array("i")
+        self._path_count = array("q")
+
+        # flat child / metric storage
+        self._children = array("i")
+        self._child_offset = array("q")
+        self._metrics = array("i")
+
+        # (child_start, label id) -> child index
+        self._child_lookup = {}
+
+        self.final_outcomes = ()
+        self.outcome_index = {}
+
+    # -----------------------------
+    # Building
+    # -----------------------------
+    def intern(self, text):
+        sid = self._string_ids.get(text)
+        if sid is None:
+            sid = len(self.strings)
+            self.strings.append(sys.intern(text))
+            self._string_ids[text] = sid
+        return sid
+
+    def _intern_optional(self, text):
+        return NO_TEXT if text is None else self.intern(text)
+
+    def add_node(self, label, question=None, outcome=None, metrics=()):
+        nid = len(self._label)
+        self._label.append(self._intern_optional(label))
+        self._question.append(self._intern_optional(question))
+        self._outcome.append(self._intern_optional(outcome))
+        self._metric_start.append(len(self._metrics))
+        self._metrics.extend(self.intern(m) for m in metrics)
+        self._metric_end.append(len(self._metrics))
+        self._child_start.append(0)
+        self._child_end.append(0)
+        return nid
+
+    def add_children(self, node_ids):
+        """Store ``node_ids`` as one contiguous child range and return it."""
+        start = len(self._children)
+        self._children.extend(node_ids)
+        return start, len(self._children)
+
+    def set_children(self, nid, child_range):
+        start, end = child_range
+        for cid in self._children[start:end]:
+            if cid <= nid:
+                raise ValueError("children must be added after their parent")
+        self._child_start[nid], self._child_end[nid] = start, end
+
+    def finish(self, final_outcomes=()):
+        self.final_outcomes = tuple(self.strings[self.intern(o)] for o in final_outcomes)
+        self.outcome_index = {o: i for i, o in enumerate(self.final_outcomes)}
+
+        # Children always have larger ids than their parent, so a single
+        # reverse sweep sees every child before the node that points at it.
+        counts = array("q", bytes(8 * len(self._label)))
+        heights = array("i", bytes(4 * len(self._label)))
+        for nid in range(len(self._label) - 1, -1, -1):
+            start, end = self._child_start[nid], self._child_end[nid]
+            if start == end:
+                counts[nid] = 1
+            else:
+                children = self._children[start:end]
+                counts[nid] = sum(counts[c] for c in children)
+                heights[nid] = 1 + max(heights[c] for c in children)
+        self._path_count = counts
+        self.depth = heights[self.root] if heights else 0
+
+        offsets = array("q", bytes(8 * len(self._children)))
+        lookup = {}
+        for nid in range(len(self._label)):
+            start, end = self._child_start[nid], self._child_end[nid]
+            if start == end or (start, self._label[self._children[start]]) in lookup:
+                continue
+            running = 0
+            for k in range(start, end):
+                cid = self._children[k]
+                offsets[k] = running
+                running += counts[cid]
+                key = (start, self._label[cid])
+                if key in lookup:
+                    raise ValueError(f"duplicate option {self.strings[self._label[cid]]!r}")
+                lookup[key] = k - start
+        self._child_offset = offsets
+        self._child_lookup = lookup
+        return self
+
+    # -----------------------------
+    # Node access
+    # -----------------------------
+    def _text(self, sid):
+        return None if sid == NO_TEXT else self.strings[sid]
+
+    def __len__(self):
+        return len(self._label)
+
+    def nbytes(self):
+        """Approximate memory held by the tree, for size-bounded caches."""
+        columns = (self._label, self._question, self._outcome, self._metric_start, self._metric_end,
+                   self._child_start, self._child_end, self._path_count, self._children, self._child_offset,
+                   self._metrics)
+        size = sum(sys.getsizeof(c) for c in columns)
+        size += sys.getsizeof(self.strings) + sum(sys.getsizeof(s) for s in self.strings)
+        size += sys.getsizeof(self._string_ids) + sys.getsizeof(self._child_lookup)
+        return size + 64 * len(self._child_lookup)
+
+    def label(self, nid):
+        return self._text(self._label[nid])
+
+    def question(self, nid):
+        return self._text(self._question[nid])
+
+    def outcome(self, nid):
+        return self._text(self._outcome[nid])
+
+    def metrics(self, nid):
+        strings = self.strings
+        return [strings[s] for s in self._metrics[self._metric_start[nid]:self._metric_end[nid]]]
+
+    def has_metrics(self, nid):
+        return self._metric_end[nid] > self._metric_start[nid]
+
+    def n_children(self, nid):
+        return self._child_end[nid] - self._child_start[nid]
+
+    def is_leaf(self, nid):
+        return self._child_end[nid] == self._child_start[nid]
+
+    def child(self, nid, index):
+        if not 0 <= index < self._child_end[nid] - self._child_start[nid]:
+            raise IndexError(f"option {index} out of range for node {nid}")
+        return self._children[self._child_start[nid] + index]
+
+    def options(self, nid):
+        strings, labels = self.strings, self._label
+        return [strings[labels[c]] for c in self._children[self._child_start[nid]:self._child_end[nid]]]
+
+    def child_index(self, nid, label):
+        sid = self._string_ids.get(label)
+        index = None
+        if not self.is_leaf(nid):
+            index = self._child_lookup.get((self._child_start[nid], sid))
+        if index is None:
+            raise KeyError(label)
+        return index
+
+    def path_count(self, nid=TreeBase.root):
+        return self._path_count[nid]
+
+    def child_offsets(self, nid):
+        return self._child_offset[self._child_start[nid]:self._child_end[nid]]
+
+
+def compile_tree(tree, final_outcomes=(), root_question=ROOT_QUESTION):
+    """Compile the nested ``TREE`` dict used by ``app.py``.
+
+    Level 2 and level 3 are independent questions asked under each level 1
+    choice, so every level 2 option shares the same child range holding the
+    level 3 options instead of duplicating them.
+    """
+    ct = CompiledTree()
+    root = ct.add_node(None, question=root_question)
+
+    directions = [ct.add_node(name, question=node["question_lvl1"]) for name, node in tree.items()]
+    ct.set_children(root, ct.add_children(directions))
+
+    for did, node in zip(directions, tree.values()):
+        lvl1_ids = [
+            ct.add_node(
+                name,
+                question=leaf["question_lvl2"],
+                outcome=leaf.get("outcome_lvl2"),
+                metrics=leaf.get("metrics", ()),
+            )
+            for name, leaf in node["options_lvl1"].items()
+        ]
+        ct.set_children(did, ct.add_children(lvl1_ids))
+
+        for lid, leaf in zip(lvl1_ids, node["options_lvl1"].values()):
+            lvl2_ids = [ct.add_node(opt, question=leaf["question_lvl3"]) for opt in leaf["options_lvl2"]]
+            ct.set_children(lid, ct.add_children(lvl2_ids))
+            lvl3_range = ct.add_children([ct.add_node(opt) for opt in leaf["options_lvl3"]])
+            for oid in lvl2_ids:
+                ct.set_children(oid, lvl3_range)
+
+    return ct.finish(final_outcomes)
+
+
+def compile_nodes(definition):
+    """Compile a tree of arbitrary depth and branching.
+
+    Every node is a mapping with optional ``question`` (asked to choose among
+    its options), ``outcome``, ``metrics`` and ``options``. ``options`` maps
+    labels to child nodes, or is a plain list of labels for leaf options::
+
+        {"question": "...", "final_outcomes": [...],
+         "options": {"A": {"outcome": "...", "metrics": [...], "options": [...]}}}
+    """
+    ct = CompiledTree()
+    root = ct.add_node(None, question=definition.get("question"))
+    pending = [(root, definition)]
+    while pending:
+        nid, node = pending.pop()
+        options = node.get("options") or {}
+        if isinstance(options, list):
+            options = {label: {} for label in options}
+        children = [child or {} for child in options.values()]
+        ids = [
+            ct.add_node(label, question=child.get("question"), outcome=child.get("outcome"),
+                        metrics=child.get("metrics", ()))
+            for label, child in zip(options, children)
+        ]
+        if ids:
+            ct.set_children(nid, ct.add_children(ids))
+        pending.extend(zip(ids, children))
+    return ct.finish(definition.get("final_outcomes", ()))
+
+
+def tree_payload(tree):
+    """Flat, JSON-ready form of any tree for clients outside Python.
+
+    ``{"version", "final_outcomes", "strings", "nodes"}``
+    where each node is ``[label, question, outcome, metrics, children]``:
+    texts are indices into ``strings`` (``-1`` for none), ``metrics`` is a
+    list of string indices or ``null`` when the node defines none (the
+    deepest node on a path that defines metrics applies), and ``children``
+    lists node indices. Node 0 is the root; nodes shared by several parents
+    appear once.
+    """
+    strings, string_ids = [], {}
+
+    def sid(text):
+        if not text:
+            return NO_TEXT
+        index = string_ids.get(text)
+        if index is None:
+            index = string_ids[text] = len(strings)
+            strings.append(text)
+        return index
+
+    ids = {tree.root: 0}
+    order = [tree.root]
+    nodes = []
+    for nid in order:  # grows while iterating: breadth-first numbering
+        children = []
+        for i in range(tree.n_children(nid)):
+            child = tree.child(nid, i)
+            if child not in ids:
+                ids[child] = len(order)
+                order.append(child)
+            children.append(ids[child])
+        metrics = [sid(m) for m in tree.metrics(nid)] if tree.has_metrics(nid) else None
+        label = tree.label(nid) if nid != tree.root else None
+        nodes.append([sid(label), sid(tree.question(nid)), sid(tree.outcome(nid)), metrics, children])
+    return {
+        "version": tree.version,
+        "final_outcomes": list(tree.final_outcomes),
+        "strings": strings,
+        "nodes": nodes,
+    }
@@ -0,0 +1,244 @@
+"""Streaming bulk export of stored summaries to CSV, Parquet or Excel.
+
+::
+
+    python -m diagnostic.export summaries.csv --since 2025-01-01 --until 2025-04-01
+    python -m diagnostic.export q1.parquet --direction Innovation --tenant acme
+    python -m diagnostic.export ops.xlsx --path "Operational Excellence" --path "Cost / Efficiency"
+
+Rows are read from the store in id order, ``CHUNK_SIZE`` at a time, each
+chunk on a briefly borrowed connection, and written out before the next one
+is read, so memory stays flat however many rows match. List fields are
+flattened into numbered columns (``recommended_metric_1``, ...,
+``target_outcome_3``); the column widths come from one aggregate pass over
+the matching rows. Parquet output is written one record batch per chunk and
+needs ``pyarrow``; Excel output uses openpyxl's write-only mode.
+"""
+import argparse
+import csv
+import json
+import sys
+
+from .loader import DEFAULT_TREE_PATH, TreeError, load_tree
+from .store import DEFAULT_STORE_PATH, SummaryStore
+from .summary import choice_key
+
+CHUNK_SIZE = 5_000
+EXCEL_MAX_ROWS = 1_048_576
+
+LIST_COLUMNS = (
+    ("recommended_metrics", "recommended_metric"),
+    ("selected_metrics_tracked", "tracked_metric"),
+    ("target_outcomes_12_18_months", "target_outcome"),
+)
+
+
+class ExportError(ValueError):
+    pass
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def _where(since=None, until=None, direction=None, tree=None, prefix=None, tenant=None):
+    clauses, params = [], []
+    if tenant:
+        clauses.append("tenant = ?")
+        params.append(tenant)
+    if since:
+        clauses.append("created_utc >= ?")
+        params.append(since)
+    if until:
+        clauses.append("created_utc < ?")
+        params.append(until)
+    if direction:
+        clauses.append("direction = ?")
+        params.append(direction)
+    if prefix is not None:
+        # Paths under a prefix have contiguous dense ids in their tree version.
+        ids = tree.path_range(prefix)
+        clauses.append("tree_version = ? AND path_index >= ? AND path_index < ?")
+        params.extend((tree.version, ids.start, ids.stop))
+    return clauses, params
+
+
+class Query:
+    """Filters over the ``summaries`` table; ``None`` means unfiltered.
+
+    ``path`` is a list of labels from the direction down and needs ``tree``;
+    it matches summaries recorded on that tree version. ``until`` is exclusive.
+    """
+
+    def __init__(self, since=None, until=None, direction=None, path=None, tree=None, tenant=None):
+        prefix = None
+        if path:
+            if tree is None:
+                raise ExportError("filtering by path needs the tree")
+            try:
+                prefix = tree.path_for_labels(path)
+            except (KeyError, IndexError) as exc:
+                raise ExportError(f"unknown path {list(path)}") from exc
+        self.clauses, self.params = _where(since, until, direction, tree, prefix, tenant)
+
+    def sql(self, select, extra=()):
+        clauses = list(self.clauses) + list(extra)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return f"SELECT {select} FROM summaries{where}"
+
+
+def columns(store, query):
+    """Flat column names wide enough for every row matching ``query``."""
+    widths = ", ".join(f"MAX(json_array_length(summary, '$.{field}'))" for field, _ in LIST_COLUMNS)
+    levels = (
+        "MAX((SELECT COUNT(*) FROM json_each(summary)"
+        " WHERE key = 'direction' OR key GLOB 'level_[0-9]*_choice'))"
+    )
+    with store.connection() as conn:
+        row = conn.execute(query.sql(f"{levels}, {widths}"), query.params).fetchone()
+    depth, recommended, tracked, outcomes = [n or 0 for n in row]
+
+    def numbered(prefix, width):
+        return [f"{prefix}_{i}" for i in range(1, width + 1)]
+
+    return (
+        ["id", "created_utc", "session_id", "tree_version", "timestamp_utc"]
+        + [choice_key(d) for d in range(depth)]
+        + numbered("recommended_metric", recommended)
+        + numbered("tracked_metric", tracked)
+        + ["notes"]
+        + numbered("target_outcome", outcomes)
+        + ["success_statement"]
+    )
+
+
+def iter_rows(store, query, names, chunk_size=CHUNK_SIZE):
+    """Yield lists of flat rows (one list per chunk) in ``names`` order."""
+    slots = {name: i for i, name in enumerate(names)}
+    last_id = 0
+    while True:
+        with store.connection() as conn:
+            chunk = conn.execute(
+                query.sql("id, created_utc, session_id, tree_version, summary", ["id > ?"]) + " ORDER BY id LIMIT ?",
+                (*query.params, last_id, chunk_size),
+            ).fetchall()
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+        yield [_flatten(row, slots, len(names)) for row in chunk]
+
+
+def _flatten(row, slots, width):
+    id_, created, session_id, version, raw = row
+    summary = json.loads(raw)
+    out = [None] * width
+    out[0], out[1], out[2], out[3] = id_, created, session_id, version
+    for key, value in summary.items():
+        slot = slots.get(key)
+        if slot is not None:
+            out[slot] = value
+    for field, prefix in LIST_COLUMNS:
+        for i, value in enumerate(summary.get(field) or (), start=1):
+            out[slots[f"{prefix}_{i}"]] = value
+    return out
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+def write_csv(path, names, chunks):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+def write_parquet(path, names, chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ExportError("pyarrow is required for Parquet export") from exc
+
+    schema = pa.schema([pa.field("id", pa.int64())] + [pa.field(n, pa.string()) for n in names[1:]])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            # Transpose the chunk into one Arrow array per column.
+            arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*chunk), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def write_excel(path, names, chunks):
+    try:
+        from openpyxl import Workbook
+    except ImportError as exc:
+        raise ExportError("openpyxl is required for Excel export") from exc
+
+    # Write-only workbooks stream rows to disk; a sheet holds at most
+    # EXCEL_MAX_ROWS rows including the header, so long exports spill over.
+    workbook = Workbook(write_only=True)
+    sheet, rows_in_sheet, count = None, EXCEL_MAX_ROWS, 0
+    for chunk in chunks:
+        for row in chunk:
+            if rows_in_sheet == EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet(f"summaries_{len(workbook.worksheets) + 1}")
+                sheet.append(names)
+                rows_in_sheet = 1
+            sheet.append(row)
+            rows_in_sheet += 1
+        count += len(chunk)
+    if sheet is None:
+        workbook.create_sheet("summaries_1").append(names)
+    workbook.save(path)
+    return count
+
+
+WRITERS = {".csv": write_csv, ".parquet": write_parquet, ".xlsx": write_excel}
+
+
+def export(store, path, query, chunk_size=CHUNK_SIZE):
+    """Write every summary matching ``query`` to ``path``; the format follows its suffix."""
+    suffix = path[path.rfind("."):].lower() if "." in path else ""
+    writer = WRITERS.get(suffix)
+    if writer is None:
+        raise ExportError(f"unsupported export format {suffix!r} (use {', '.join(WRITERS)})")
+    names = columns(store, query)
+    return writer(path, names, iter_rows(store, query, names, chunk_size))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored summaries to CSV, Parquet or Excel.")
+    parser.add_argument("output", help="destination .csv, .parquet or .xlsx")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--since", help="first created_utc to include (e.g. 2025-01-01)")
+    parser.add_argument("--until", help="created_utc to stop before (exclusive)")
+    parser.add_argument("--direction")
+    parser.add_argument("--tenant", help="only this tenant's summaries")
+    parser.add_argument("--path", action="append", metavar="LABEL",
+                        help="path prefix, one label per level; repeat for deeper levels")
+    parser.add_argument("--tree", default=DEFAULT_TREE_PATH, help="tree the --path labels refer to")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    store = SummaryStore(args.store)
+    try:
+        tree = load_tree(args.tree) if args.path else None
+        query = Query(args.since, args.until, args.direction, args.path, tree, args.tenant)
+        count = export(store, args.output, query, args.chunk_size)
+    except (TreeError, ExportError) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+    print(f"{count} summaries written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
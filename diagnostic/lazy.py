@@ -0,0 +1,212 @@
+"""On-disk packed trees that load nodes lazily.
+
+``pack_tree`` writes a compiled tree to a directory::
+
+    meta.json   version, node count, depth, final outcomes
+    index.bin   little-endian uint64 byte offsets, one per node plus an end marker
+    nodes.bin   one compact JSON record per node, in node id order
+
+``LazyTree`` memory-maps both binary files and decodes a node record only when
+that node is visited, keeping a bounded LRU of decoded records shared by every
+session in the process. A session therefore holds nothing but its path tuple,
+and a worker only ever materializes the nodes users actually walk through.
+Siblings get consecutive ids when a tree is compiled, so the records for one
+set of options sit next to each other in ``nodes.bin``.
+
+Pack a definition with::
+
+    python -m diagnostic.lazy trees/enterprise.json trees/enterprise.packed
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+
+from .compiled import TreeBase
+
+META_FILE = "meta.json"
+INDEX_FILE = "index.bin"
+NODES_FILE = "nodes.bin"
+CACHE_SIZE = 4096
+NODE_BYTES = 1024  # rough size of one decoded _Node
+
+_OFFSET = struct.Struct("<Q")
+_SPAN = struct.Struct("<2Q")
+
+
+def pack_tree(tree, directory):
+    """Write ``tree`` (any ``TreeBase``) to ``directory`` in the packed format.
+
+    Files are written next to their targets and renamed into place, with
+    ``meta.json`` last, so workers that still map an older version keep
+    reading intact files and the loader sees a new version only once it is
+    complete.
+    """
+    os.makedirs(directory, exist_ok=True)
+    blob_path, index_path, meta_path = (os.path.join(directory, name) for name in (NODES_FILE, INDEX_FILE, META_FILE))
+    with open(blob_path + ".tmp", "wb") as blob, open(index_path + ".tmp", "wb") as index:
+        offset = 0
+        for nid in range(len(tree)):
+            record = {"l": tree.label(nid), "n": tree.path_count(nid)}
+            if tree.question(nid) is not None:
+                record["q"] = tree.question(nid)
+            if tree.outcome(nid) is not None:
+                record["o"] = tree.outcome(nid)
+            if tree.has_metrics(nid):
+                record["m"] = tree.metrics(nid)
+            if not tree.is_leaf(nid):
+                record["c"] = [tree.child(nid, i) for i in range(tree.n_children(nid))]
+                record["cl"] = tree.options(nid)
+                record["co"] = list(tree.child_offsets(nid))
+            data = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            index.write(_OFFSET.pack(offset))
+            blob.write(data)
+            offset += len(data)
+        index.write(_OFFSET.pack(offset))
+
+    meta = {
+        "version": tree.version,
+        "nodes": len(tree),
+        "depth": tree.depth,
+        "final_outcomes": list(tree.final_outcomes),
+    }
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    for path in (blob_path, index_path, meta_path):
+        os.replace(path + ".tmp", path)
+
+
+class _Node:
+    __slots__ = ("label", "question", "outcome", "metrics", "children", "options", "offsets", "paths", "lookup")
+
+    def __init__(self, record):
+        self.label = record["l"]
+        self.question = record.get("q")
+        self.outcome = record.get("o")
+        self.metrics = tuple(record.get("m", ()))
+        self.children = tuple(record.get("c", ()))
+        self.options = tuple(record.get("cl", ()))
+        self.offsets = tuple(record.get("co", ()))
+        self.paths = record["n"]
+        self.lookup = {label: i for i, label in enumerate(self.options)}
+
+
+class LazyTree(TreeBase):
+    def __init__(self, directory, cache_size=CACHE_SIZE):
+        self.source = directory
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.version = meta["version"]
+        self._n_nodes = meta["nodes"]
+        self.depth = meta["depth"]
+        self.final_outcomes = tuple(meta["final_outcomes"])
+        self.outcome_index = {o: i for i, o in enumerate(self.final_outcomes)}
+
+        self._files = []
+        self._index = self._map(os.path.join(directory, INDEX_FILE))
+        self._blob = self._map(os.path.join(directory, NODES_FILE))
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _map(self, path):
+        f = open(path, "rb")
+        self._files.append(f)
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        self._index.close()
+        self._blob.close()
+        for f in self._files:
+            f.close()
+
+    def _node(self, nid):
+        with self._lock:
+            node = self._cache.get(nid)
+            if node is not None:
+                self._cache.move_to_end(nid)
+                return node
+        if not 0 <= nid < self._n_nodes:
+            raise IndexError(nid)
+        start, end = _SPAN.unpack_from(self._index, nid * _OFFSET.size)
+        node = _Node(json.loads(self._blob[start:end]))
+        with self._lock:
+            self._cache[nid] = node
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return node
+
+    # -----------------------------
+    # Node access
+    # -----------------------------
+    def __len__(self):
+        return self._n_nodes
+
+    def nbytes(self):
+        """Approximate heap held by the tree once its node cache is full; the mapped files are not counted."""
+        return self.cache_size * NODE_BYTES
+
+    def label(self, nid):
+        return self._node(nid).label
+
+    def question(self, nid):
+        return self._node(nid).question
+
+    def outcome(self, nid):
+        return self._node(nid).outcome
+
+    def metrics(self, nid):
+        return list(self._node(nid).metrics)
+
+    def has_metrics(self, nid):
+        return bool(self._node(nid).metrics)
+
+    def n_children(self, nid):
+        return len(self._node(nid).children)
+
+    def is_leaf(self, nid):
+        return not self._node(nid).children
+
+    def child(self, nid, index):
+        children = self._node(nid).children
+        if not 0 <= index < len(children):
+            raise IndexError(f"option {index} out of range for node {nid}")
+        return children[index]
+
+    def options(self, nid):
+        return list(self._node(nid).options)
+
+    def child_index(self, nid, label):
+        return self._node(nid).lookup[label]
+
+    def child_offsets(self, nid):
+        return self._node(nid).offsets
+
+    def path_count(self, nid=TreeBase.root):
+        return self._node(nid).paths
+
+
+def main(argv=None):
+    from .loader import TreeError, load_tree
+
+    parser = argparse.ArgumentParser(description="Pack a tree definition for lazy loading.")
+    parser.add_argument("definition", help="tree definition (.json/.yaml)")
+    parser.add_argument("directory", help="output directory")
+    args = parser.parse_args(argv)
+    try:
+        tree = load_tree(args.definition)
+    except TreeError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    pack_tree(tree, args.directory)
+    print(f"packed {len(tree)} nodes ({tree.path_count()} paths) into {args.directory}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
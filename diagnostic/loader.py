@@ -0,0 +1,330 @@
+"""Loading tree definitions from JSON/YAML files with a process-wide cache.
+
+A definition file holds either the three-level ``TREE`` dict, the
+``FINAL_OUTCOMES`` list and the root question::
+
+    {"root_question": "...", "tree": {...}, "final_outcomes": [...]}
+
+or a tree of arbitrary depth in the nested node format of
+``compile_nodes``::
+
+    {"question": "...", "options": {...}, "final_outcomes": [...]}
+
+A directory written by ``diagnostic.lazy.pack_tree`` loads as a ``LazyTree``
+that decodes nodes on demand instead of compiling the whole tree.
+
+``load_tree`` parses, validates and compiles a file once per content version
+and shares the result across every session in the process. The file is
+re-stat'ed at most every ``CHECK_INTERVAL`` seconds; a changed mtime or size
+triggers a re-hash, and only a changed hash triggers a recompile. If a
+changed file fails to load (say, half-saved), the last good version keeps
+being served. ``TreeCache`` holds the compiled trees and is shared with the
+per-tenant registry in ``diagnostic.tenants``.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .compiled import ROOT_QUESTION, compile_nodes, compile_tree
+
+DEFAULT_TREE_PATH = os.environ.get(
+    "DIAGNOSTIC_TREE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "trees", "default.json"),
+)
+CHECK_INTERVAL = 2.0
+KEEP_VERSIONS = 8
+
+LEVEL1_KEYS = ("question_lvl1", "options_lvl1")
+LEAF_KEYS = ("outcome_lvl2", "question_lvl2", "options_lvl2", "question_lvl3", "options_lvl3", "metrics")
+
+
+log = logging.getLogger(__name__)
+
+
+class TreeError(ValueError):
+    pass
+
+
+class _Entry:
+    __slots__ = ("stat", "digest", "checked")
+
+    def __init__(self, stat, digest):
+        self.stat = stat
+        self.digest = digest
+        self.checked = time.monotonic()
+
+
+# -----------------------------
+# Parsing + validation
+# -----------------------------
+def parse_definition(raw, path):
+    """Parse a JSON or YAML definition; syntax errors raise ``TreeError``."""
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise TreeError("PyYAML is required to load YAML tree definitions") from exc
+        try:
+            return yaml.safe_load(raw)
+        except yaml.YAMLError as exc:
+            raise TreeError(f"{path}: invalid YAML: {exc}") from exc
+    try:
+        return json.loads(raw)
+    except ValueError as exc:
+        raise TreeError(f"{path}: invalid JSON: {exc}") from exc
+
+
+def _check_strings(values, where, problems):
+    if not isinstance(values, list) or not values:
+        problems.append(f"{where}: expected a non-empty list")
+        return
+    if any(not isinstance(v, str) or not v for v in values):
+        problems.append(f"{where}: entries must be non-empty strings")
+    if len(set(values)) != len(values):
+        problems.append(f"{where}: duplicate entries")
+
+
+def _check_text(value, where, problems):
+    if not isinstance(value, str) or not value:
+        problems.append(f"{where}: expected a non-empty string")
+
+
+def _validate_legacy(definition, problems):
+    if "root_question" in definition:
+        _check_text(definition["root_question"], "root_question", problems)
+    tree = definition.get("tree")
+    if not isinstance(tree, dict) or not tree:
+        problems.append("tree: expected a non-empty mapping of directions")
+        return
+
+    for direction, node in tree.items():
+        _check_text(direction, f"{direction!r}", problems)
+        if not isinstance(node, dict) or any(k not in node for k in LEVEL1_KEYS):
+            problems.append(f"{direction}: expected keys {', '.join(LEVEL1_KEYS)}")
+            continue
+        _check_text(node["question_lvl1"], f"{direction} / question_lvl1", problems)
+        options = node["options_lvl1"]
+        if not isinstance(options, dict) or not options:
+            problems.append(f"{direction}: options_lvl1 must be a non-empty mapping")
+            continue
+        for choice, leaf in options.items():
+            where = f"{direction} / {choice}"
+            _check_text(choice, f"{direction} / {choice!r}", problems)
+            missing = [k for k in LEAF_KEYS if not isinstance(leaf, dict) or k not in leaf]
+            if missing:
+                problems.append(f"{where}: missing {', '.join(missing)}")
+                continue
+            for key in ("outcome_lvl2", "question_lvl2", "question_lvl3"):
+                _check_text(leaf[key], f"{where} / {key}", problems)
+            for key in ("options_lvl2", "options_lvl3", "metrics"):
+                _check_strings(leaf[key], f"{where} / {key}", problems)
+
+
+def _validate_nodes(definition, problems):
+    pending = [("(root)", definition)]
+    while pending:
+        where, node = pending.pop()
+        if node is None:
+            continue
+        if not isinstance(node, dict):
+            problems.append(f"{where}: expected a mapping")
+            continue
+        for key in ("question", "outcome"):
+            if key in node:
+                _check_text(node[key], f"{where} / {key}", problems)
+        if "metrics" in node:
+            _check_strings(node["metrics"], f"{where} / metrics", problems)
+        options = node.get("options")
+        if options is None:
+            continue
+        if isinstance(options, list):
+            _check_strings(options, f"{where} / options", problems)
+        elif isinstance(options, dict) and options:
+            if "question" not in node:
+                problems.append(f"{where}: a node with options needs a question")
+            for label in options:
+                _check_text(label, f"{where} / {label!r}", problems)
+            pending.extend((f"{where} / {label}", child) for label, child in options.items())
+        else:
+            problems.append(f"{where} / options: expected a non-empty mapping or list")
+    if not definition.get("options"):
+        problems.append("options: the root needs at least one option")
+
+
+def validate_definition(definition):
+    """Raise ``TreeError`` listing every structural problem in ``definition``."""
+    problems = []
+    if not isinstance(definition, dict):
+        raise TreeError("tree definition must be a mapping")
+    _check_strings(definition.get("final_outcomes"), "final_outcomes", problems)
+    if "tree" in definition:
+        _validate_legacy(definition, problems)
+    else:
+        _validate_nodes(definition, problems)
+
+    if problems:
+        raise TreeError("invalid tree definition:\n  " + "\n  ".join(problems))
+    return definition
+
+
+def compile_definition(definition, version=None):
+    validate_definition(definition)
+    if "tree" in definition:
+        tree = compile_tree(
+            definition["tree"],
+            definition["final_outcomes"],
+            definition.get("root_question", ROOT_QUESTION),
+        )
+    else:
+        tree = compile_nodes(definition)
+    tree.version = version
+    return tree
+
+
+# -----------------------------
+# Cached loading
+# -----------------------------
+class TreeCache:
+    """Compiled trees keyed by ``(name, version)`` in a size-bounded LRU.
+
+    ``path_for(name)`` locates a definition; the default uses the name as the
+    path. Each tree costs ``size(tree)`` against ``max_size`` (one per tree
+    unless overridden), and the newest tree always stays. When a changed
+    definition fails to load, the error is logged and the last good version
+    of that name keeps being served; a name that never loaded raises
+    ``TreeError``.
+    """
+
+    def __init__(self, max_size=KEEP_VERSIONS):
+        self.max_size = max_size
+        self._trees = OrderedDict()  # (name, version) -> (tree, size)
+        self._current = {}           # name -> _Entry
+        self._size = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def path_for(self, name):
+        return name
+
+    def size(self, tree):
+        return 1
+
+    def _count(self, result):
+        """Called with ``"hit"``, ``"miss"`` or ``"eviction"``."""
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._trees.get(key)
+            if entry is None:
+                return None
+            self._trees.move_to_end(key)
+            return entry[0]
+
+    def _insert(self, key, tree):
+        size = self.size(tree)
+        evictions = 0
+        with self._lock:
+            if key in self._trees:
+                return self._trees[key][0]
+            self._trees[key] = (tree, size)
+            self._size += size
+            while self._size > self.max_size and len(self._trees) > 1:
+                _, (_, evicted) = self._trees.popitem(last=False)
+                self._size -= evicted
+                evictions += 1
+        for _ in range(evictions):
+            self._count("eviction")
+        return tree
+
+    def get(self, name):
+        """Return the current tree of ``name``, recompiling only when its content changed."""
+        entry = self._current.get(name)
+        if entry is not None and time.monotonic() - entry.checked < CHECK_INTERVAL:
+            tree = self._lookup((name, entry.digest))
+            if tree is not None:
+                self._count("hit")
+                return tree
+
+        with self._load_lock:
+            entry = self._current.get(name)
+            try:
+                return self._load(name, entry)
+            except (KeyError, OSError, TypeError, ValueError) as exc:
+                error = _tree_error(name, exc)
+                last = entry and self._lookup((name, entry.digest))
+                if last is None:
+                    raise error from exc
+                entry.checked = time.monotonic()
+                log.error("keeping version %s of %s: %s", entry.digest, name, error)
+                return last
+
+    def _load(self, name, entry):
+        path = self.path_for(name)
+        packed = os.path.isdir(path)
+        if packed:
+            # Only packed trees need the mmap-based reader.
+            from .lazy import META_FILE, LazyTree
+        st = os.stat(os.path.join(path, META_FILE) if packed else path)
+        stat = (st.st_mtime_ns, st.st_size)
+        if entry is not None and entry.stat == stat:
+            tree = self._lookup((name, entry.digest))
+            if tree is not None:
+                entry.checked = time.monotonic()
+                self._count("hit")
+                return tree
+
+        if packed:
+            tree = LazyTree(path)
+            digest = tree.version = tree.version or f"packed-{st.st_mtime_ns}"
+            cached = self._lookup((name, digest))
+            if cached is not None:
+                tree.close()
+                tree = cached
+        else:
+            with open(path, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()[:16]
+            cached = tree = self._lookup((name, digest))
+            if tree is None:
+                tree = compile_definition(parse_definition(raw, path), version=digest)
+                tree.source = path
+        # A touched but unchanged file still counts as a hit.
+        self._count("hit" if cached is not None else "miss")
+        tree = self._insert((name, digest), tree)
+        self._current[name] = _Entry(stat, digest)
+        return tree
+
+    def get_version(self, name, version):
+        """Return a resident tree of ``name`` by version, or ``None`` if it was evicted."""
+        tree = self._lookup((name, version))
+        self._count("hit" if tree is not None else "miss")
+        return tree
+
+    def versions(self, name):
+        """Versions of ``name`` that are resident, without counting a lookup."""
+        with self._lock:
+            return [version for owner, version in self._trees if owner == name]
+
+
+def _tree_error(name, exc):
+    if isinstance(exc, TreeError):
+        return exc
+    if isinstance(exc, OSError):
+        return TreeError(f"cannot read tree definition {name}: {exc.strerror or exc}")
+    return TreeError(f"invalid tree definition {name}: {exc!r}")
+
+
+_cache = TreeCache()
+
+
+def load_tree(path=DEFAULT_TREE_PATH):
+    """Return the compiled tree for ``path``, recompiling only when its content changed.
+
+    A missing, unreadable or malformed definition raises ``TreeError`` unless
+    an earlier version of it loaded, which is then kept.
+    """
+    return _cache.get(str(path))
@@ -0,0 +1,331 @@
+"""Roadmap reports rendered from stored summaries, per participant and per team.
+
+::
+
+    python -m diagnostic.reports reports/ --format md --format html
+    python -m diagnostic.reports reports/ --workshop ops-2025-03 --workers 8
+
+A participant is a session (its latest stored summary); a team is everyone
+who took the diagnostic in one workshop. Each report lists the chosen path
+and levers, the tracked metrics and the gaps to close, the targeted outcomes
+and the success statement; team reports aggregate the same over members.
+Reports are built from the summary records alone, so they do not depend on
+the tree version a summary was recorded on.
+
+Rendering fans out over a process pool. The templates in
+``templates/roadmap/`` are parsed once per worker, and jobs are sent in
+chunks so each task amortizes its round trip. Runs are incremental: every
+report's content hash (inputs plus templates) is kept in ``manifest.json``
+in the output directory and reports whose hash is unchanged are skipped.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from string import Template
+
+from .store import DEFAULT_STORE_PATH, SummaryStore
+from .summary import choice_key, level_name
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates" / "roadmap"
+MANIFEST = "manifest.json"
+JOBS_PER_TASK = 250
+# Levels from here on are the levers; the ones above make up the path.
+LEVER_DEPTH = 2
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class ReportError(ValueError):
+    pass
+
+
+# -----------------------------
+# Formats
+# -----------------------------
+class Markdown:
+    suffix = ".md"
+
+    @staticmethod
+    def plain(value):
+        return value
+
+    @staticmethod
+    def text(value, empty="_Not given._"):
+        return value.strip() or empty
+
+    @staticmethod
+    def items(values, empty="_None._"):
+        return "\n".join(f"- {v}" for v in values) or empty
+
+    @staticmethod
+    def table(headers, rows, empty="_None._"):
+        if not rows:
+            return empty
+        cell = lambda v: str(v).replace("|", "\\|")  # noqa: E731
+        lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+        lines.extend("| " + " | ".join(cell(v) for v in row) + " |" for row in rows)
+        return "\n".join(lines)
+
+    @staticmethod
+    def page(title, body):
+        return body
+
+
+class Html:
+    suffix = ".html"
+
+    @staticmethod
+    def plain(value):
+        return html.escape(value)
+
+    @staticmethod
+    def text(value, empty="<em>Not given.</em>"):
+        return html.escape(value.strip()) or empty
+
+    @staticmethod
+    def items(values, empty="<p><em>None.</em></p>"):
+        if not values:
+            return empty
+        return "<ul>" + "".join(f"<li>{html.escape(str(v))}</li>" for v in values) + "</ul>"
+
+    @staticmethod
+    def table(headers, rows, empty="<p><em>None.</em></p>"):
+        if not rows:
+            return empty
+        head = "".join(f"<th>{html.escape(h)}</th>" for h in headers)
+        body = "".join(
+            "<tr>" + "".join(
+                f'<td class="n">{v}</td>' if isinstance(v, int) else f"<td>{html.escape(str(v))}</td>" for v in row
+            ) + "</tr>"
+            for row in rows
+        )
+        return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+    @staticmethod
+    def page(title, body):
+        return _templates()["page.html"].substitute(title=html.escape(title), body=body)
+
+
+FORMATS = {"md": Markdown, "html": Html}
+
+
+# -----------------------------
+# Templates
+# -----------------------------
+_TEMPLATES = None
+
+
+def _templates():
+    """Parsed templates, loaded once per process."""
+    global _TEMPLATES
+    if _TEMPLATES is None:
+        _TEMPLATES = {
+            path.name: Template(path.read_text(encoding="utf-8")) for path in sorted(TEMPLATE_DIR.iterdir())
+        }
+    return _TEMPLATES
+
+
+def templates_digest():
+    digest = hashlib.sha256()
+    for name, template in _templates().items():
+        digest.update(name.encode("utf-8"))
+        digest.update(template.template.encode("utf-8"))
+    return digest.hexdigest()
+
+
+# -----------------------------
+# Report content
+# -----------------------------
+def choices(summary):
+    """``(level name, label)`` for each choice on the summary's path."""
+    out = []
+    while choice_key(len(out)) in summary:
+        out.append((level_name(len(out)), summary[choice_key(len(out))]))
+    return out
+
+
+def metric_gaps(summary):
+    tracked = set(summary["selected_metrics_tracked"])
+    return [m for m in summary["recommended_metrics"] if m not in tracked]
+
+
+def participant_fields(fmt, name, workshop, summary):
+    path = choices(summary)
+    return {
+        "title": fmt.plain(name),
+        "meta": fmt.plain(f"Workshop {workshop} · submitted {summary['timestamp_utc']}" if workshop
+                          else f"Submitted {summary['timestamp_utc']}"),
+        "path": fmt.items([f"{level}: {label}" for level, label in path[:LEVER_DEPTH]]),
+        "levers": fmt.items([f"{level}: {label}" for level, label in path[LEVER_DEPTH:]]),
+        "tracked": fmt.items(summary["selected_metrics_tracked"]),
+        "gaps": fmt.items(metric_gaps(summary)),
+        "outcomes": fmt.items(summary["target_outcomes_12_18_months"]),
+        "success": fmt.text(summary["success_statement"]),
+        "notes": fmt.text(summary["notes"]),
+    }
+
+
+def team_fields(fmt, workshop, summaries):
+    paths, levers, gaps, outcomes = Counter(), Counter(), Counter(), Counter()
+    for summary in summaries:
+        path = choices(summary)
+        paths[" → ".join(label for _, label in path[:LEVER_DEPTH])] += 1
+        levers.update(f"{level}: {label}" for level, label in path[LEVER_DEPTH:])
+        gaps.update(metric_gaps(summary))
+        outcomes.update(summary["target_outcomes_12_18_months"])
+    statements = sorted({s["success_statement"].strip() for s in summaries} - {""})
+    return {
+        "title": fmt.plain(workshop),
+        "meta": f"{len(summaries)} participants",
+        "paths": fmt.table(["Path", "Participants"], paths.most_common()),
+        "levers": fmt.table(["Lever", "Participants"], levers.most_common()),
+        "gaps": fmt.table(["Metric", "Participants without it"], gaps.most_common()),
+        "outcomes": fmt.table(["Outcome", "Participants"], outcomes.most_common()),
+        "success": fmt.items(statements),
+    }
+
+
+def render(kind, fmt, fields, title):
+    body = _templates()[kind + fmt.suffix].substitute(fields)
+    return fmt.page(f"Roadmap — {title}", body)
+
+
+# -----------------------------
+# Jobs
+# -----------------------------
+def safe_name(key):
+    # Keys differing only in replaced characters ("b/1", "b_1") keep apart
+    # through a short hash of the raw key.
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:8]
+    return f"{_SAFE_NAME.sub('_', key).strip('._')[:120] or '_'}-{digest}"
+
+
+def participants(store, workshop=None):
+    """Yield ``(name, workshop, summary)`` for each participant's latest summary, in id order."""
+    where, params = "", ()
+    if workshop is not None:
+        where, params = " AND workshop = ?", (workshop,)
+    with store.connection() as conn:
+        # A session holds one record per tree version; the most recent wins.
+        rows = conn.execute(
+            "SELECT id, session_id, workshop, summary FROM summaries WHERE id IN ("
+            "SELECT MAX(id) FROM summaries GROUP BY COALESCE(session_id, 'summary-' || id))"
+            f"{where} ORDER BY id",
+            params,
+        ).fetchall()
+    for id_, session_id, team, raw in rows:
+        yield session_id or f"summary-{id_}", team, json.loads(raw)
+
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def plan(store, formats, workshop=None):
+    """Every report as ``(relative name, kind, args, hash)``; teams need at least one participant."""
+    base = templates_digest(), sorted(formats)
+    jobs, teams = [], {}
+    for name, team, summary in participants(store, workshop):
+        args = (name, team, summary)
+        jobs.append((f"participants/{safe_name(name)}", "participant", args, _digest(base, args)))
+        if team:
+            teams.setdefault(team, []).append(jobs[-1])
+    for team, members in sorted(teams.items()):
+        args = (team, [job[2][2] for job in members])
+        digest = _digest(base, team, [job[3] for job in members])
+        jobs.append((f"teams/{safe_name(team)}", "team", args, digest))
+    return jobs
+
+
+def _render_jobs(out_dir, formats, jobs):
+    for rel, kind, args, _ in jobs:
+        target = os.path.join(out_dir, rel)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        for key in formats:
+            fmt = FORMATS[key]
+            fields = participant_fields(fmt, *args) if kind == "participant" else team_fields(fmt, *args)
+            with open(target + fmt.suffix, "w", encoding="utf-8") as f:
+                f.write(render(kind, fmt, fields, args[0]))
+    return len(jobs)
+
+
+def _init_worker():
+    _templates()
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def build_reports(store, out_dir, formats=("md",), workshop=None, workers=None, force=False,
+                  jobs_per_task=JOBS_PER_TASK):
+    """Render every changed report into ``out_dir``; returns ``(rendered, skipped)``."""
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ReportError(f"unknown report format(s) {sorted(unknown)} (use {', '.join(FORMATS)})")
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(out_dir)
+    jobs = plan(store, formats, workshop)
+    todo = [
+        job for job in jobs
+        if manifest.get(job[0]) != job[3]
+        or not all(os.path.exists(os.path.join(out_dir, job[0] + FORMATS[f].suffix)) for f in formats)
+    ]
+    chunks = [todo[i:i + jobs_per_task] for i in range(0, len(todo), jobs_per_task)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            _render_jobs(out_dir, formats, chunk)
+    else:
+        with ProcessPoolExecutor(min(workers, len(chunks)), initializer=_init_worker) as pool:
+            for _ in pool.map(_render_jobs, [out_dir] * len(chunks), [formats] * len(chunks), chunks):
+                pass
+    manifest.update((job[0], job[3]) for job in todo)
+    _save_manifest(out_dir, manifest)
+    return len(todo), len(jobs) - len(todo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render roadmap reports from stored diagnostic summaries.")
+    parser.add_argument("output", help="directory for participants/ and teams/ reports")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--format", action="append", choices=sorted(FORMATS), dest="formats",
+                        help="report format; repeat for several (default: md)")
+    parser.add_argument("--workshop", help="only this workshop's participants and team")
+    parser.add_argument("--workers", type=int, help="rendering processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="re-render unchanged reports too")
+    args = parser.parse_args(argv)
+
+    store = SummaryStore(args.store)
+    try:
+        rendered, skipped = build_reports(store, args.output, args.formats or ["md"], args.workshop, args.workers,
+                                          args.force)
+    except ReportError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+    print(f"{rendered} reports rendered, {skipped} unchanged, in {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Maturity scores per dimension, computed from diagnostic summaries.
+
+Every summary is reduced to a row of features:
+
+``metric_coverage``
+    share of the recommended metrics that are tracked (0-1).
+``notes`` / ``success_statement``
+    1 when the free-text field is filled in.
+``outcome_count``
+    number of targeted final outcomes relative to the maximum allowed.
+``outcome:<name>`` / ``evidence:<name>``
+    1 when the final outcome is targeted / metric coverage if it is (0 otherwise).
+``direction:<name>``
+    1 for the chosen direction.
+
+``<name>`` is an outcome or direction label up to its first parenthesis, so
+``Financial (EBITDA, margin, cost-to-serve)`` becomes ``Financial``. Scores
+are ``features @ weights`` clipped to 0-1 and reported on a 0-100 scale. The
+weight matrix maps features to dimensions and can be loaded from a JSON/YAML
+file of ``{dimension: {feature: weight}}``; ``DIAGNOSTIC_WEIGHTS`` points the
+app at one.
+
+All rows of a batch are scored with one matrix product, so a whole portfolio
+of stored summaries costs little more than a single session::
+
+    python -m diagnostic.scoring summaries.jsonl -o scores.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from .batch import MAX_OUTCOMES, UnreadableRow, read_responses
+from .loader import DEFAULT_TREE_PATH, TreeError, load_tree, parse_definition
+from .store import DEFAULT_TENANT, summary_masks
+from .summary import choice_key
+
+DEFAULT_WEIGHTS_PATH = os.environ.get("DIAGNOSTIC_WEIGHTS")
+
+
+class WeightsError(ValueError):
+    pass
+
+
+def short_name(label):
+    return label.split(" (")[0].strip()
+
+
+def feature_names(tree):
+    outcomes = [short_name(o) for o in tree.final_outcomes]
+    return (
+        ["metric_coverage", "notes", "success_statement", "outcome_count"]
+        + [f"outcome:{o}" for o in outcomes]
+        + [f"evidence:{o}" for o in outcomes]
+        + [f"direction:{short_name(d)}" for d in tree.options(tree.root)]
+    )
+
+
+class Weights:
+    """A ``(features, dimensions)`` weight matrix for one tree's feature layout."""
+
+    def __init__(self, dimensions, features, matrix):
+        self.dimensions = tuple(dimensions)
+        self.features = tuple(features)
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        if self.matrix.shape != (len(self.features), len(self.dimensions)):
+            raise WeightsError(f"weight matrix has shape {self.matrix.shape}, expected "
+                               f"{(len(self.features), len(self.dimensions))}")
+
+    @classmethod
+    def from_mapping(cls, tree, mapping):
+        features = feature_names(tree)
+        column = {f: i for i, f in enumerate(features)}
+        if not isinstance(mapping, dict) or not mapping:
+            raise WeightsError("weights must map dimension names to {feature: weight}")
+        matrix = np.zeros((len(features), len(mapping)))
+        for j, (dimension, row) in enumerate(mapping.items()):
+            if not isinstance(row, dict):
+                raise WeightsError(f"{dimension}: expected a mapping of feature weights")
+            for feature, weight in row.items():
+                if feature not in column:
+                    raise WeightsError(f"{dimension}: unknown feature {feature!r}")
+                if not isinstance(weight, (int, float)) or isinstance(weight, bool):
+                    raise WeightsError(f"{dimension}.{feature}: weight must be a number")
+                matrix[column[feature], j] = weight
+        return cls(mapping, features, matrix)
+
+    def to_mapping(self):
+        return {
+            dimension: {f: float(w) for f, w in zip(self.features, self.matrix[:, j]) if w}
+            for j, dimension in enumerate(self.dimensions)
+        }
+
+
+def default_weights(tree):
+    """Evidence and focus, plus one dimension per final outcome."""
+    mapping = {
+        "Evidence": {"metric_coverage": 0.8, "notes": 0.2},
+        "Focus": {"outcome_count": 0.4, "success_statement": 0.6},
+    }
+    for outcome in tree.final_outcomes:
+        name = short_name(outcome)
+        mapping[name] = {f"outcome:{name}": 0.4, f"evidence:{name}": 0.6}
+    return Weights.from_mapping(tree, mapping)
+
+
+def load_weights(path, tree):
+    with open(path, encoding="utf-8") as f:
+        try:
+            mapping = parse_definition(f.read(), path)
+        except ValueError as exc:
+            raise WeightsError(f"{path}: {exc}") from exc
+    return Weights.from_mapping(tree, mapping)
+
+
+_lock = threading.Lock()
+_weights = {}
+
+
+def get_weights(tree):
+    """Weights from ``DIAGNOSTIC_WEIGHTS`` (or the defaults), cached per tree version."""
+    key = tree.version if tree.version is not None else id(tree)
+    with _lock:
+        weights = _weights.get(key)
+    if weights is None:
+        weights = load_weights(DEFAULT_WEIGHTS_PATH, tree) if DEFAULT_WEIGHTS_PATH else default_weights(tree)
+        with _lock:
+            weights = _weights.setdefault(key, weights)
+    return weights
+
+
+# -----------------------------
+# Features
+# -----------------------------
+def feature_matrix(tree, path_index, metrics_mask, outcomes_mask, notes, success):
+    """Feature rows for arrays of dense path ids, bitsets and text flags.
+
+    The bitsets are those kept by ``diagnostic.store`` (at most 63 bits).
+    """
+    path_index = np.asarray(path_index, dtype=np.int64)
+    metrics_mask = np.asarray(metrics_mask, dtype=np.int64)
+    outcomes_mask = np.asarray(outcomes_mask, dtype=np.int64)
+    n = len(path_index)
+
+    # Recommended-metric counts are looked up once per distinct path.
+    paths, inverse = np.unique(path_index, return_inverse=True)
+    per_path = np.array([len(tree.path_metrics(tree.path_from_index(int(i)))) for i in paths], dtype=np.int64)
+    recommended = per_path[inverse.reshape(-1)] if n else np.zeros(0, dtype=np.int64)
+    tracked = np.zeros(n)
+    for bit in range(int(recommended.max(initial=0))):
+        tracked += (metrics_mask >> bit) & 1
+    coverage = tracked / np.maximum(recommended, 1)
+
+    k = len(tree.final_outcomes)
+    targeted = ((outcomes_mask[:, None] >> np.arange(k)) & 1).astype(np.float64)
+
+    # Paths under one direction form a contiguous id range.
+    offsets = np.asarray(tree.child_offsets(tree.root), dtype=np.int64)
+    direction = np.zeros((n, len(offsets)))
+    direction[np.arange(n), np.searchsorted(offsets, path_index, side="right") - 1] = 1.0
+
+    return np.column_stack([
+        coverage,
+        np.asarray(notes, dtype=np.float64),
+        np.asarray(success, dtype=np.float64),
+        targeted.sum(axis=1) / MAX_OUTCOMES,
+        targeted,
+        targeted * coverage[:, None],
+        direction,
+    ])
+
+
+def score_matrix(features, weights):
+    """``(n, dimensions)`` scores on a 0-100 scale."""
+    return np.clip(features @ weights.matrix, 0.0, 1.0) * 100.0
+
+
+def _summary_row(tree, summary, path=None):
+    if isinstance(summary, UnreadableRow):
+        raise ValueError(summary.message)
+    if path is None:
+        labels = []
+        while summary.get(choice_key(len(labels))):
+            labels.append(summary[choice_key(len(labels))])
+        path = tree.path_for_labels(labels)
+    metrics_mask, outcomes_mask = summary_masks(tree, summary)
+    return (
+        tree.path_index(path),
+        metrics_mask,
+        outcomes_mask,
+        bool(summary.get("notes", "").strip()),
+        bool(summary.get("success_statement", "").strip()),
+    )
+
+
+def score_summaries(tree, summaries, weights=None):
+    """Score an iterable of summary dicts for ``tree`` as one batch."""
+    weights = weights or get_weights(tree)
+    rows = [_summary_row(tree, s) for s in summaries]
+    columns = list(zip(*rows)) if rows else [()] * 5
+    return score_matrix(feature_matrix(tree, *columns), weights)
+
+
+def score_summary(tree, summary, weights=None, path=None):
+    """``{dimension: score}`` for one summary; ``path`` skips the label lookup."""
+    weights = weights or get_weights(tree)
+    features = feature_matrix(tree, *([v] for v in _summary_row(tree, summary, path)))
+    return dict(zip(weights.dimensions, score_matrix(features, weights)[0].tolist()))
+
+
+def score_store(store, tree, weights=None, tenant=DEFAULT_TENANT):
+    """Score every summary stored for ``tree``'s version, straight from the stored ids and bitsets."""
+    weights = weights or get_weights(tree)
+    with store.connection() as conn:
+        rows = conn.execute(
+            "SELECT path_index, metrics_mask, outcomes_mask,"
+            " COALESCE(json_extract(summary, '$.notes'), '') != '',"
+            " COALESCE(json_extract(summary, '$.success_statement'), '') != ''"
+            " FROM summaries WHERE tenant = ? AND tree_version = ? AND path_index IS NOT NULL",
+            (tenant, tree.version),
+        ).fetchall()
+    columns = list(zip(*rows)) if rows else [()] * 5
+    return score_matrix(feature_matrix(tree, *columns), weights)
+
+
+def portfolio(scores, weights):
+    """Mean and quartiles per dimension for a ``score_*`` result."""
+    if not len(scores):
+        return []
+    q25, q50, q75 = np.percentile(scores, [25, 50, 75], axis=0)
+    mean = scores.mean(axis=0)
+    return [
+        {"dimension": d, "mean": float(mean[j]), "p25": float(q25[j]), "p50": float(q50[j]), "p75": float(q75[j])}
+        for j, d in enumerate(weights.dimensions)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score diagnostic summaries per maturity dimension.")
+    parser.add_argument("input", help="summaries as .jsonl (e.g. from diagnostic.batch)")
+    parser.add_argument("-o", "--output", help="per-summary scores as .jsonl (default: stdout)")
+    parser.add_argument("--tree", default=DEFAULT_TREE_PATH, help="tree definition (.json/.yaml)")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS_PATH, help="weight matrix (.json/.yaml)")
+    args = parser.parse_args(argv)
+
+    try:
+        tree = load_tree(args.tree)
+        weights = load_weights(args.weights, tree) if args.weights else default_weights(tree)
+        scores = score_summaries(tree, read_responses(args.input), weights)
+    except (TreeError, WeightsError) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    except (KeyError, IndexError, ValueError) as exc:
+        print(f"{args.input}: summary does not match the tree: {exc}", file=sys.stderr)
+        return 1
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for row in scores:
+            out.write(json.dumps(dict(zip(weights.dimensions, np.round(row, 2).tolist())), ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    for stats in portfolio(scores, weights):
+        print(f"{stats['dimension']:>12}: mean {stats['mean']:5.1f}  p50 {stats['p50']:5.1f}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Inverted index over every question, option, outcome and metric of a tree.
+
+Each searchable string becomes a document carrying the path that leads to
+where it appears. Documents are tokenized on word characters, and every token
+is indexed under all of its prefixes (edge n-grams) up to ``MAX_PREFIX``
+characters, so each query token resolves with one dictionary probe and
+multi-word queries intersect the posting lists. Posting lists are stored in
+ranking order, so the best hits are simply the first ones.
+
+Indexes are built once per tree version and shared by every session in the
+process through ``get_index``.
+"""
+import re
+import threading
+from collections import OrderedDict, deque
+
+MAX_PREFIX = 12
+KEEP_INDEXES = 8
+
+KIND_RANK = {"option": 0, "question": 1, "metric": 2, "outcome": 3, "final_outcome": 4}
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class Hit:
+    __slots__ = ("kind", "text", "path")
+
+    def __init__(self, kind, text, path):
+        self.kind = kind
+        self.text = text
+        self.path = path
+
+    def __repr__(self):
+        return f"Hit({self.kind!r}, {self.text!r}, {self.path!r})"
+
+
+class SearchIndex:
+    def __init__(self, tree):
+        self.version = tree.version
+        hits = []
+        indexed = set()
+
+        def add(kind, text, path):
+            # Texts repeated across branches (a level 3 question asked under
+            # every level 2 option) are indexed once, under the first path.
+            if text and (kind, text) not in indexed:
+                indexed.add((kind, text))
+                hits.append(Hit(kind, text, path))
+
+        # Breadth-first, so a node reachable along several paths (shared
+        # option lists) is indexed once under its shortest path. The root
+        # question is always on screen and leads nowhere, so it is skipped.
+        seen = {tree.root}
+        queue = deque([(tree.root, ())])
+        while queue:
+            nid, path = queue.popleft()
+            if path:
+                add("option", tree.label(nid), path)
+                add("outcome", tree.outcome(nid), path)
+                for metric in tree.metrics(nid):
+                    add("metric", metric, path)
+                add("question", tree.question(nid), path)
+            for i in range(tree.n_children(nid)):
+                child = tree.child(nid, i)
+                if child not in seen:
+                    seen.add(child)
+                    queue.append((child, path + (i,)))
+        for outcome in tree.final_outcomes:
+            add("final_outcome", outcome, None)
+
+        # Doc ids follow the ranking (options first, then shorter strings),
+        # so every posting list is already in result order and a query can
+        # stop as soon as it has collected ``limit`` matches.
+        hits.sort(key=lambda h: (KIND_RANK[h.kind], len(h.text)))
+        self.docs = hits
+        self._tokens = []
+        postings = {}
+        for doc, hit in enumerate(hits):
+            tokens = tuple(dict.fromkeys(tokenize(hit.text)))
+            self._tokens.append(tokens)
+            keys = {token[:n] for token in tokens for n in range(1, min(len(token), MAX_PREFIX) + 1)}
+            for key in keys:
+                postings.setdefault(key, []).append(doc)
+        self._postings = {key: tuple(docs) for key, docs in postings.items()}
+
+    def __len__(self):
+        return len(self.docs)
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` hits containing every query token as a word prefix."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        lists = sorted((self._postings.get(t[:MAX_PREFIX], ()) for t in tokens), key=len)
+        if len(lists) == 1:
+            candidates = lists[0]
+        else:
+            matches = set(lists[0])
+            for docs in lists[1:]:
+                matches.intersection_update(docs)
+                if not matches:
+                    return []
+            candidates = sorted(matches)
+
+        # Tokens longer than the indexed prefixes still need a full check.
+        long_tokens = [t for t in tokens if len(t) > MAX_PREFIX]
+        found = []
+        for doc in candidates:
+            if long_tokens and not all(any(dt.startswith(t) for dt in self._tokens[doc]) for t in long_tokens):
+                continue
+            found.append(self.docs[doc])
+            if len(found) == limit:
+                break
+        return found
+
+
+_lock = threading.Lock()
+_indexes = OrderedDict()
+
+
+def get_index(tree):
+    """Return the shared index for ``tree``'s version, building it on first use."""
+    key = tree.version if tree.version is not None else id(tree)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = SearchIndex(tree)
+    with _lock:
+        index = _indexes.setdefault(key, index)
+        while len(_indexes) > KEEP_INDEXES:
+            _indexes.popitem(last=False)
+    return index
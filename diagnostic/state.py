@@ -0,0 +1,232 @@
+"""Compact session state, its URL encoding, and idle-session eviction.
+
+A session's answers are packed into ``PackedState``: the path as option
+indices, tracked metrics and chosen outcomes as bitsets (bit ``i`` refers to
+the ``i``-th recommended metric / final outcome), plus the two free-text
+fields. ``encode`` turns it into a short URL-safe token (varints, optionally
+zlib-compressed, base64url) tagged with the tree version, so a session can
+be resumed or shared from its URL without any server-side memory.
+
+``SessionRegistry`` tracks an approximate footprint per live session and,
+once the process-wide total exceeds a budget, evicts the sessions that have
+been idle longest. Evicted users lose nothing that is in their URL.
+"""
+import base64
+import hashlib
+import threading
+import time
+import zlib
+
+FORMAT_RAW = 1
+FORMAT_ZLIB = 2
+TAG_BYTES = 4
+
+SESSION_OVERHEAD = 64 * 1024
+IDLE_SECONDS = 15 * 60
+CHECK_INTERVAL = 30.0
+
+
+class StateError(ValueError):
+    pass
+
+
+def bits(positions):
+    mask = 0
+    for p in positions:
+        mask |= 1 << p
+    return mask
+
+
+def positions(mask):
+    pos = 0
+    while mask:
+        if mask & 1:
+            yield pos
+        mask >>= 1
+        pos += 1
+
+
+class PackedState:
+    __slots__ = ("path", "metrics", "outcomes", "notes", "success")
+
+    def __init__(self, path=(), metrics=0, outcomes=0, notes="", success=""):
+        self.path = tuple(path)
+        self.metrics = metrics
+        self.outcomes = outcomes
+        self.notes = notes
+        self.success = success
+
+    def __eq__(self, other):
+        return isinstance(other, PackedState) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self):
+        return "PackedState(" + ", ".join(f"{s}={getattr(self, s)!r}" for s in self.__slots__) + ")"
+
+
+# -----------------------------
+# Encoding
+# -----------------------------
+def _varint(value, out):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    shift = value = 0
+    while True:
+        if pos >= len(data):
+            raise StateError("truncated state")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def version_tag(version):
+    if version is None:
+        return bytes(TAG_BYTES)
+    return hashlib.blake2b(str(version).encode("utf-8"), digest_size=TAG_BYTES).digest()
+
+
+def encode(state, version=None):
+    body = bytearray()
+    _varint(len(state.path), body)
+    for index in state.path:
+        _varint(index, body)
+    _varint(state.metrics, body)
+    _varint(state.outcomes, body)
+    for text in (state.notes, state.success):
+        raw = text.encode("utf-8")
+        _varint(len(raw), body)
+        body += raw
+
+    packed = zlib.compress(bytes(body), 9)
+    fmt, payload = (FORMAT_ZLIB, packed) if len(packed) < len(body) else (FORMAT_RAW, bytes(body))
+    token = bytes([fmt]) + version_tag(version) + payload
+    return base64.urlsafe_b64encode(token).rstrip(b"=").decode("ascii")
+
+
+def decode(token, version=None):
+    """Decode a token from ``encode``; raise ``StateError`` if it is invalid or for another tree version."""
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError) as exc:
+        raise StateError("malformed state") from exc
+    if len(data) < 1 + TAG_BYTES or data[0] not in (FORMAT_RAW, FORMAT_ZLIB):
+        raise StateError("malformed state")
+    if version is not None and data[1:1 + TAG_BYTES] != version_tag(version):
+        raise StateError("state was saved for a different tree version")
+    body = data[1 + TAG_BYTES:]
+    if data[0] == FORMAT_ZLIB:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as exc:
+            raise StateError("malformed state") from exc
+
+    depth, pos = _read_varint(body, 0)
+    path = []
+    for _ in range(depth):
+        index, pos = _read_varint(body, pos)
+        path.append(index)
+    metrics, pos = _read_varint(body, pos)
+    outcomes, pos = _read_varint(body, pos)
+    texts = []
+    for _ in range(2):
+        size, pos = _read_varint(body, pos)
+        if pos + size > len(body):
+            raise StateError("truncated state")
+        texts.append(body[pos:pos + size].decode("utf-8", "replace"))
+        pos += size
+    return PackedState(path, metrics, outcomes, *texts)
+
+
+# -----------------------------
+# Eviction
+# -----------------------------
+class SessionRegistry:
+    """Approximate per-session memory accounting with idle eviction.
+
+    ``evict`` is called with a session id (outside the registry lock) for each
+    session chosen for eviction and should release it. Sessions also end on
+    their own; every ``check_interval`` the ones idle for ``idle_seconds``
+    that ``is_alive`` reports gone (all of them, without ``is_alive``) stop
+    being counted.
+    """
+
+    def __init__(self, budget_bytes, evict, idle_seconds=IDLE_SECONDS, check_interval=CHECK_INTERVAL,
+                 is_alive=None):
+        self.budget_bytes = budget_bytes
+        self.idle_seconds = idle_seconds
+        self.check_interval = check_interval
+        self._evict = evict
+        self._is_alive = is_alive
+        self._sessions = {}
+        self._total = 0
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def touch(self, session_id, nbytes):
+        now = time.monotonic()
+        with self._lock:
+            previous = self._sessions.get(session_id)
+            self._total += nbytes + SESSION_OVERHEAD - (previous[1] if previous else 0)
+            self._sessions[session_id] = (now, nbytes + SESSION_OVERHEAD)
+            if now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            victims = self._select_victims(now) if self._total > self.budget_bytes else []
+            idle = [
+                sid for sid, (seen, _) in self._sessions.items()
+                if now - seen >= self.idle_seconds and sid not in victims
+            ]
+        for sid in victims:
+            try:
+                self._evict(sid)
+            finally:
+                self.forget(sid)
+                self.evicted += 1
+        for sid in idle:
+            if self._is_alive is None or not self._is_alive(sid):
+                self._forget_idle(sid, now)
+
+    def _select_victims(self, now):
+        idle = sorted(
+            (seen, sid) for sid, (seen, _) in self._sessions.items() if now - seen >= self.idle_seconds
+        )
+        victims, total = [], self._total
+        for _, sid in idle:
+            if total <= self.budget_bytes:
+                break
+            victims.append(sid)
+            total -= self._sessions[sid][1]
+        return victims
+
+    def forget(self, session_id):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry:
+                self._total -= entry[1]
+
+    def _forget_idle(self, session_id, now):
+        # The session may have come back since it was found idle.
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry and now - entry[0] >= self.idle_seconds:
+                del self._sessions[session_id]
+                self._total -= entry[1]
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def __len__(self):
+        return len(self._sessions)
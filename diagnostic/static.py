@@ -0,0 +1,55 @@
+"""Self-contained static HTML export of the diagnostic.
+
+Renders a tree into one HTML file that runs entirely in the browser: the tree
+is embedded as the minified ``compiled.tree_payload`` JSON and a small script
+walks it, renders the questions and builds the summary JSON with the same
+keys, order and formatting as ``build_summary`` and the app's export::
+
+    python -m diagnostic.static -o dist/diagnostic.html
+
+The file needs no server beyond static hosting and holds no state.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from .batch import MAX_OUTCOMES
+from .compiled import tree_payload
+from .loader import DEFAULT_TREE_PATH, TreeError, load_tree
+from .summary import LEVEL_NAMES
+
+TEMPLATE = Path(__file__).resolve().parent / "templates" / "static.html"
+PLACEHOLDER = "/*PAYLOAD*/"
+
+
+def build_html(tree):
+    payload = tree_payload(tree)
+    payload["level_names"] = list(LEVEL_NAMES)
+    payload["max_outcomes"] = MAX_OUTCOMES
+    # "</" would end the embedding <script> element early.
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    return TEMPLATE.read_text(encoding="utf-8").replace(PLACEHOLDER, data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the diagnostic as a self-contained static HTML file.")
+    parser.add_argument("-o", "--output", default="dist/diagnostic.html")
+    parser.add_argument("--tree", default=DEFAULT_TREE_PATH, help="tree definition (.json/.yaml or packed dir)")
+    args = parser.parse_args(argv)
+
+    try:
+        tree = load_tree(args.tree)
+    except TreeError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    html = build_html(tree)
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(html, encoding="utf-8")
+    print(f"{output}: {len(html.encode('utf-8')) / 1024:.1f} KiB, {tree.path_count()} paths", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
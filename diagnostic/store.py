@@ -0,0 +1,406 @@
+"""Persistent SQLite store for completed diagnostic summaries.
+
+``submit`` only enqueues the record; a background writer thread drains the
+queue and commits whole batches in one transaction on its own connection, so
+the Streamlit script thread never waits on disk. A session keeps one record
+per tree version: its key (session + tree version) is UNIQUE, and a later
+state of the same session replaces the earlier one instead of adding a row.
+States already submitted are also skipped in memory, so repeated reruns
+write nothing. Readers borrow connections from a small pool; the database
+runs in WAL mode so reads don't block the writer.
+
+Aggregate rollups (submissions per path, tracked metrics, chosen outcomes,
+and per-cohort histograms of metric coverage and final choices) are
+maintained in the same transaction as each write, keyed by tenant, tree
+version and compiled ids, so dashboards and cohort comparisons never rescan the
+summaries table. Replacing a record moves its counts: the old state is
+subtracted as the new one is added, so every participant counts once.
+Every write, replacements included, gets a fresh id, so ``last_id`` tells
+readers whether anything changed.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from .state import bits, positions
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "DIAGNOSTIC_STORE", str(Path(__file__).resolve().parent.parent / "data" / "summaries.sqlite3")
+)
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 0.5
+POOL_SIZE = 4
+RECENT_KEYS = 10_000
+DEFAULT_TENANT = "default"
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    id INTEGER PRIMARY KEY,
+    idem_key TEXT NOT NULL UNIQUE,
+    created_utc TEXT NOT NULL,
+    session_id TEXT,
+    tree_version TEXT,
+    path_index INTEGER,
+    direction TEXT,
+    metric_node INTEGER,
+    metrics_mask INTEGER,
+    outcomes_mask INTEGER,
+    summary TEXT NOT NULL,
+    workshop TEXT,
+    cohort INTEGER,
+    lever INTEGER,
+    tenant TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS summaries_created ON summaries (created_utc);
+
+CREATE TABLE IF NOT EXISTS path_counts (
+    tenant TEXT NOT NULL,
+    tree_version TEXT NOT NULL,
+    path_index INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (tenant, tree_version, path_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS metric_counts (
+    tenant TEXT NOT NULL,
+    tree_version TEXT NOT NULL,
+    node INTEGER NOT NULL,
+    metric INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (tenant, tree_version, node, metric)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS outcome_counts (
+    tenant TEXT NOT NULL,
+    tree_version TEXT NOT NULL,
+    outcome INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (tenant, tree_version, outcome)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cohort_coverage (
+    tenant TEXT NOT NULL,
+    tree_version TEXT NOT NULL,
+    workshop TEXT NOT NULL,
+    cohort INTEGER NOT NULL,
+    tracked INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (tenant, tree_version, workshop, cohort, tracked)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cohort_levers (
+    tenant TEXT NOT NULL,
+    tree_version TEXT NOT NULL,
+    workshop TEXT NOT NULL,
+    cohort INTEGER NOT NULL,
+    lever INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (tenant, tree_version, workshop, cohort, lever)
+) WITHOUT ROWID;
+"""
+
+COLUMNS = (
+    "idem_key", "created_utc", "session_id", "tree_version", "path_index", "direction",
+    "metric_node", "metrics_mask", "outcomes_mask", "summary", "workshop", "cohort", "lever", "tenant",
+)
+# Everything the rollups of a stored record are derived from.
+ROLLUP_COLUMNS = ("tenant", "tree_version", "path_index", "metric_node", "metrics_mask", "outcomes_mask",
+                  "workshop", "cohort", "lever")
+_ROLLUP_SLOTS = [COLUMNS.index(c) for c in ROLLUP_COLUMNS]
+
+# A cohort is every summary sharing the first COHORT_DEPTH choices (direction
+# and level 1) within one workshop.
+COHORT_DEPTH = 2
+
+UPSERT = (
+    "INSERT INTO {table} ({columns}, count) VALUES ({marks}, ?) "
+    "ON CONFLICT DO UPDATE SET count = count + excluded.count"
+)
+
+
+def is_complete(summary):
+    """A summary counts as submitted once outcomes and a success statement are given."""
+    return bool(summary["target_outcomes_12_18_months"]) and bool(summary["success_statement"].strip())
+
+
+def idempotency_key(summary, session_id=None, tree_version=None, tenant=DEFAULT_TENANT):
+    """Key of the record ``summary`` is stored as.
+
+    A session has one record per tenant and tree version that later states
+    replace.
+    Without a session every distinct summary, timestamp included, is a
+    record of its own.
+    """
+    if session_id is not None:
+        raw = json.dumps(["session", session_id, tenant, tree_version])
+    else:
+        raw = json.dumps(["summary", summary], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def content_digest(summary):
+    content = {k: v for k, v in summary.items() if k != "timestamp_utc"}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")).digest()
+
+
+def summary_masks(tree, summary):
+    """Tracked metrics (by position among the recommended ones) and chosen outcomes as bitsets."""
+    tracked = set(summary["selected_metrics_tracked"])
+    metrics_mask = bits(i for i, m in enumerate(summary["recommended_metrics"]) if m in tracked)
+    outcomes_mask = bits(
+        tree.outcome_index[o] for o in summary["target_outcomes_12_18_months"] if o in tree.outcome_index
+    )
+    return metrics_mask, outcomes_mask
+
+
+def cohort_node(tree, path):
+    """Node identifying the cohort of ``path``: its choice at ``COHORT_DEPTH``."""
+    return tree.resolve(path[:COHORT_DEPTH])
+
+
+def _upsert(conn, table, columns, counter):
+    counter = {key: n for key, n in counter.items() if n}
+    if not counter:
+        return
+    sql = UPSERT.format(table=table, columns=", ".join(columns), marks=", ".join("?" * len(columns)))
+    conn.executemany(sql, [(*key, n) for key, n in counter.items()])
+    drained = [key for key, n in counter.items() if n < 0]
+    if drained:
+        match = " AND ".join(f"{c} = ?" for c in columns)
+        conn.executemany(f"DELETE FROM {table} WHERE {match} AND count <= 0", drained)
+
+
+class _Rollups:
+    """Pending rollup deltas of one batch."""
+
+    def __init__(self):
+        self.paths, self.metrics, self.outcomes = Counter(), Counter(), Counter()
+        self.coverage, self.levers = Counter(), Counter()
+
+    def add(self, record, sign):
+        tenant, version, path_index, metric_node, metrics_mask, outcomes_mask, workshop, cohort, lever = record
+        if path_index is None:
+            return
+        self.paths[(tenant, version, path_index)] += sign
+        if metric_node is not None:
+            for m in positions(metrics_mask):
+                self.metrics[(tenant, version, metric_node, m)] += sign
+        for o in positions(outcomes_mask):
+            self.outcomes[(tenant, version, o)] += sign
+        if cohort is not None:
+            workshop = workshop or ""
+            self.coverage[(tenant, version, workshop, cohort, bin(metrics_mask).count("1"))] += sign
+            self.levers[(tenant, version, workshop, cohort, lever)] += sign
+
+    def write(self, conn):
+        _upsert(conn, "path_counts", ("tenant", "tree_version", "path_index"), self.paths)
+        _upsert(conn, "metric_counts", ("tenant", "tree_version", "node", "metric"), self.metrics)
+        _upsert(conn, "outcome_counts", ("tenant", "tree_version", "outcome"), self.outcomes)
+        _upsert(conn, "cohort_coverage", ("tenant", "tree_version", "workshop", "cohort", "tracked"), self.coverage)
+        _upsert(conn, "cohort_levers", ("tenant", "tree_version", "workshop", "cohort", "lever"), self.levers)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SummaryStore:
+    def __init__(self, path=DEFAULT_STORE_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 pool_size=POOL_SIZE):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._writer = _connect(self.path)
+        self._writer.executescript(SCHEMA)
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(_connect(self.path))
+
+        self._queue = queue.Queue()
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="summary-store-writer", daemon=True)
+        self._thread.start()
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+    def submit(self, summary, session_id=None, tree=None, path=None, workshop=None, tenant=DEFAULT_TENANT):
+        """Queue ``summary`` for persistence and return its idempotency key.
+
+        A summary with a ``session_id`` replaces that session's record on
+        the same tenant and tree version. With ``tree`` and ``path`` the
+        record also carries the compiled ids the rollups are keyed by, and
+        counts towards its cohort in ``workshop``.
+        """
+        tree_version = tree.version if tree is not None else None
+        key = idempotency_key(summary, session_id, tree_version, tenant)
+        digest = content_digest(summary)
+        with self._recent_lock:
+            if self._recent.get(key) == digest:
+                self._recent.move_to_end(key)
+                return key
+            self._recent[key] = digest
+            self._recent.move_to_end(key)
+            if len(self._recent) > RECENT_KEYS:
+                self._recent.popitem(last=False)
+
+        path_index = metric_node = metrics_mask = outcomes_mask = cohort = lever = None
+        if tree is not None and path is not None:
+            path_index = tree.path_index(path)
+            metric_node = tree.path_metrics_node(path)
+            metrics_mask, outcomes_mask = summary_masks(tree, summary)
+            cohort = cohort_node(tree, path)
+            # The final choice is the lever peers are compared on.
+            lever = tree.resolve(path)
+        row = (
+            key,
+            summary["timestamp_utc"],
+            session_id,
+            tree_version,
+            path_index,
+            summary.get("direction"),
+            metric_node,
+            metrics_mask,
+            outcomes_mask,
+            json.dumps(summary, ensure_ascii=False),
+            workshop,
+            cohort,
+            lever,
+            tenant,
+        )
+        self._queue.put(row)
+        return key
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far has been committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is None:
+                    self._commit(batch)
+                    for w in waiters:
+                        w.set()
+                    return
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size or waiters:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            self._commit(batch)
+            for w in waiters:
+                w.set()
+
+    def _commit(self, batch):
+        if not batch:
+            return
+        conn = self._writer
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write_batch(conn, batch)
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            log.exception("dropped a batch of %d summaries", len(batch))
+            # Unmark the dropped states so the next submit of each (say, the
+            # session's next rerun) queues it again instead of skipping it.
+            with self._recent_lock:
+                for row in batch:
+                    self._recent.pop(row[0], None)
+
+    def _write_batch(self, conn, batch):
+        rollups = _Rollups()
+        insert = f"INSERT INTO summaries ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        # A replaced record moves to a fresh id, so ids grow with every write.
+        update = (
+            "UPDATE summaries SET id = (SELECT MAX(id) + 1 FROM summaries), "
+            f"{', '.join(f'{c} = ?' for c in COLUMNS[1:])} WHERE idem_key = ?"
+        )
+        select = f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM summaries WHERE idem_key = ?"
+        for row in batch:
+            # Rows of one batch are applied in order, so a session updated
+            # twice in a batch sees its own first update here.
+            old = conn.execute(select, (row[0],)).fetchone()
+            if old is None:
+                conn.execute(insert, row)
+            else:
+                conn.execute(update, (*row[1:], row[0]))
+                rollups.add(old, -1)
+            rollups.add([row[i] for i in _ROLLUP_SLOTS], +1)
+        rollups.write(conn)
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def count(self):
+        with self.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def last_id(self):
+        """Id of the latest write; it changes whenever a record is added or replaced."""
+        with self.connection() as conn:
+            return conn.execute("SELECT MAX(id) FROM summaries").fetchone()[0] or 0
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._writer.close()
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(path=DEFAULT_STORE_PATH):
+    """Return the process-wide store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SummaryStore(path)
+                atexit.register(_store.close)
+    return _store
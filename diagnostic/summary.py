@@ -0,0 +1,32 @@
+"""Construction of the diagnostic ``summary`` record shared by the UI and batch jobs."""
+from datetime import datetime
+
+
+def now_iso():
+    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+LEVEL_NAMES = ("Direction", "Driver/Type", "Primary pain/constraint", "Likely root pattern / lever")
+
+
+def choice_key(depth):
+    return "direction" if depth == 0 else f"level_{depth}_choice"
+
+
+def level_name(depth):
+    return LEVEL_NAMES[depth] if depth < len(LEVEL_NAMES) else f"Level {depth}"
+
+
+def build_summary(tree, path, tracked_metrics=(), notes="", outcomes=(), success="", timestamp=None):
+    """Return the summary dict for ``path`` with the same key order as the app export."""
+    summary = {"timestamp_utc": timestamp or now_iso()}
+    for depth, label in enumerate(tree.path_labels(path)):
+        summary[choice_key(depth)] = label
+    recommended = tree.path_metrics(path)
+    tracked = set(tracked_metrics)
+    summary["recommended_metrics"] = recommended
+    summary["selected_metrics_tracked"] = [m for m in recommended if m in tracked]
+    summary["notes"] = notes
+    summary["target_outcomes_12_18_months"] = list(outcomes)
+    summary["success_statement"] = success
+    return summary
@@ -0,0 +1,286 @@
+"""Per-rerun timing spans, counters and a Prometheus text export.
+
+Everything is process-local and guarded by one lock. Metrics are exposed in
+the Prometheus text format through whichever of these is configured:
+
+``DIAGNOSTIC_METRICS_PORT``
+    serve ``/metrics`` on ``127.0.0.1:<port>`` from a daemon thread.
+``DIAGNOSTIC_METRICS_FILE``
+    rewrite the file every ``DIAGNOSTIC_METRICS_INTERVAL`` seconds (default 15),
+    e.g. for node_exporter's textfile collector.
+
+Sampled profiling is opt-in: ``DIAGNOSTIC_PROFILE_RATE=0.01`` profiles about
+one rerun in a hundred with cProfile and tracemalloc and writes the results to
+``DIAGNOSTIC_PROFILE_DIR`` (default ``profiles/``).
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+ACTIVE_WINDOW = 300.0
+PROFILE_TOP = 25
+
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), collect=None):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def samples(self):
+        if self.collect is not None:
+            self.values = self.collect()
+        yield from super().samples()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, *labels):
+        with _lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, n) in sorted(self.series.items()):
+            running = 0
+            for bound, c in zip(self.buckets, counts):
+                running += c
+                yield f"{self.name}_bucket", _labels(self.labelnames + ("le",), labels + (bound,)), running
+            yield f"{self.name}_bucket", _labels(self.labelnames + ("le",), labels + ("+Inf",)), n
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _labels(self.labelnames, labels), n
+
+
+# -----------------------------
+# Sessions
+# -----------------------------
+_sessions = {}
+_pruned = 0.0
+
+
+def _prune(now):
+    # Called with _lock held.
+    global _pruned
+    _pruned = now
+    cutoff = now - ACTIVE_WINDOW
+    for sid in [sid for sid, (seen, _) in _sessions.items() if seen < cutoff]:
+        del _sessions[sid]
+
+
+def touch_session(session_id, direction=None):
+    # Expired sessions are also dropped here, so the table stays bounded
+    # when no exporter ever reads it.
+    now = time.monotonic()
+    with _lock:
+        _sessions[session_id] = (now, direction)
+        if now - _pruned >= ACTIVE_WINDOW:
+            _prune(now)
+
+
+def _active_sessions():
+    with _lock:
+        _prune(time.monotonic())
+        return list(_sessions.values())
+
+
+def _collect_active():
+    return {(): len(_active_sessions())}
+
+
+def _collect_directions():
+    counts = {}
+    for _, direction in _active_sessions():
+        if direction is not None:
+            counts[(direction,)] = counts.get((direction,), 0) + 1
+    return counts
+
+
+SECTION_SECONDS = Histogram(
+    "diagnostic_section_seconds", "Time spent in each section of a script run.", ("section",)
+)
+RERUNS = Counter("diagnostic_reruns_total", "Script runs by scope (full app or a fragment).", ("scope",))
+ACTIVE_SESSIONS = Gauge(
+    "diagnostic_active_sessions", f"Sessions seen in the last {ACTIVE_WINDOW:.0f} seconds.", collect=_collect_active
+)
+SESSIONS_BY_DIRECTION = Gauge(
+    "diagnostic_active_sessions_by_direction", "Active sessions by chosen direction.", ("direction",),
+    collect=_collect_directions,
+)
+PROFILED_RERUNS = Counter("diagnostic_profiled_reruns_total", "Script runs captured by the sampling profiler.")
+
+REGISTRY = [SECTION_SECONDS, RERUNS, ACTIVE_SESSIONS, SESSIONS_BY_DIRECTION, PROFILED_RERUNS]
+
+
+@contextmanager
+def span(section):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SECTION_SECONDS.observe(time.perf_counter() - start, section)
+
+
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Export
+# -----------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_metrics_file(path):
+    tmp = f"{path}.tmp"
+    Path(tmp).write_text(render_prometheus(), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _file_writer(path, interval):
+    while True:
+        write_metrics_file(path)
+        time.sleep(interval)
+
+
+_started = False
+
+
+def setup_from_env():
+    """Start the configured exporters once per process."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    port = os.environ.get("DIAGNOSTIC_METRICS_PORT")
+    if port:
+        try:
+            serve_metrics(int(port))
+        except OSError:
+            pass  # another worker in this host already serves the port
+    path = os.environ.get("DIAGNOSTIC_METRICS_FILE")
+    if path:
+        interval = float(os.environ.get("DIAGNOSTIC_METRICS_INTERVAL", "15"))
+        threading.Thread(target=_file_writer, args=(path, interval), name="metrics-file", daemon=True).start()
+
+
+# -----------------------------
+# Sampled profiling
+# -----------------------------
+PROFILE_RATE = float(os.environ.get("DIAGNOSTIC_PROFILE_RATE", "0") or 0)
+PROFILE_DIR = os.environ.get("DIAGNOSTIC_PROFILE_DIR", "profiles")
+_profile_lock = threading.Lock()
+
+
+@contextmanager
+def maybe_profile(scope, rate=None):
+    """Profile this block for a ``rate`` fraction of calls; otherwise a no-op.
+
+    Only one block is profiled at a time per process, since cProfile and
+    tracemalloc are process-global.
+    """
+    rate = PROFILE_RATE if rate is None else rate
+    if rate <= 0 or random.random() >= rate or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stem = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{scope}")
+        pstats.Stats(profiler).dump_stats(stem + ".prof")
+        with open(stem + ".alloc.txt", "w", encoding="utf-8") as f:
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+                f.write(f"{stat}\n")
+        PROFILED_RERUNS.inc()
+    finally:
+        _profile_lock.release()
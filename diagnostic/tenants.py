@@ -0,0 +1,108 @@
+"""Per-tenant tree definitions, loaded on demand into one size-bounded cache.
+
+A tenant's definition lives in ``DIAGNOSTIC_TENANT_DIR`` (default ``trees/``)
+as ``<tenant>.json``, ``<tenant>.yaml``/``.yml`` or a packed ``<tenant>/``
+directory; the ``default`` tenant is ``DEFAULT_TREE_PATH``. Tenant names are
+restricted to letters, digits, ``-`` and ``_``.
+
+``TreeRegistry`` keys compiled trees by ``(tenant, version)`` and keeps them in
+an LRU bounded by their approximate size (``DIAGNOSTIC_TREE_CACHE_MB``,
+default 256), so only recently used tenants stay resident. It is the
+``TreeCache`` behind ``load_tree``: definitions are re-stat'ed at most every
+``CHECK_INTERVAL`` seconds, and a tenant whose file fails to reload keeps
+its last good version. Hits, misses, evictions and the resident size are
+exported through ``diagnostic.telemetry``.
+"""
+import os
+import re
+import threading
+from pathlib import Path
+
+from . import telemetry
+from .loader import DEFAULT_TREE_PATH, TreeCache, TreeError
+from .store import DEFAULT_TENANT
+
+TENANT_DIR = os.environ.get("DIAGNOSTIC_TENANT_DIR", str(Path(__file__).resolve().parent.parent / "trees"))
+CACHE_BYTES = int(float(os.environ.get("DIAGNOSTIC_TREE_CACHE_MB", "256")) * 1024 * 1024)
+
+_TENANT_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+SUFFIXES = (".json", ".yaml", ".yml")
+
+_registry = None
+
+
+class TenantError(TreeError):
+    pass
+
+
+def _collect_bytes():
+    return {(): _registry.stats()["bytes"]} if _registry is not None else {}
+
+
+TREE_CACHE = telemetry.Counter(
+    "diagnostic_tree_cache_total", "Tenant tree cache lookups and evictions.", ("result",)
+)
+TREE_CACHE_BYTES = telemetry.Gauge(
+    "diagnostic_tree_cache_bytes", "Approximate size of the resident tenant trees.", collect=_collect_bytes
+)
+telemetry.REGISTRY.extend([TREE_CACHE, TREE_CACHE_BYTES])
+
+
+class TreeRegistry(TreeCache):
+    def __init__(self, tenant_dir=TENANT_DIR, max_bytes=CACHE_BYTES, default_path=DEFAULT_TREE_PATH):
+        super().__init__(max_size=max_bytes)
+        self.tenant_dir = tenant_dir
+        self.default_path = default_path
+        self.hits = self.misses = self.evictions = 0
+
+    def path_for(self, tenant):
+        if tenant == DEFAULT_TENANT:
+            return self.default_path
+        if not _TENANT_NAME.fullmatch(tenant or ""):
+            raise TenantError(f"invalid tenant name {tenant!r}")
+        base = os.path.join(self.tenant_dir, tenant)
+        if os.path.isdir(base):
+            return base
+        for suffix in SUFFIXES:
+            if os.path.isfile(base + suffix):
+                return base + suffix
+        raise TenantError(f"unknown tenant {tenant!r}")
+
+    def size(self, tree):
+        return tree.nbytes()
+
+    def _count(self, result):
+        with self._lock:
+            if result == "hit":
+                self.hits += 1
+            elif result == "miss":
+                self.misses += 1
+            else:
+                self.evictions += 1
+        TREE_CACHE.inc(result)
+
+    def get(self, tenant=DEFAULT_TENANT):
+        """Return the current tree of ``tenant``, loading it if it is not resident."""
+        return super().get(tenant)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "trees": len(self._trees),
+                "bytes": self._size,
+                "max_bytes": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TreeRegistry()
+        return _registry
@@ -0,0 +1,86 @@
+import streamlit as st
+
+from diagnostic.analytics import load_rollups, metric_usage, path_breakdown, stored_versions, top_outcomes
+from diagnostic.loader import TreeError
+from diagnostic.scoring import get_weights, portfolio, score_store
+from diagnostic.store import get_store
+from diagnostic.summary import level_name
+from diagnostic.tenants import DEFAULT_TENANT, get_registry
+
+st.set_page_config(page_title="Diagnostic Dashboard", layout="wide")
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def portfolio_stats(tenant, version, last_id, _tree, _weights):
+    # Scoring reads every stored summary of the version; the store's last id
+    # changes with each write, so the scores are only recomputed after one.
+    return portfolio(score_store(get_store(), _tree, _weights, tenant), _weights)
+
+
+st.title("Submitted diagnostics")
+
+store = get_store()
+tenant = st.query_params.get("tenant", DEFAULT_TENANT)
+registry = get_registry()
+try:
+    latest = registry.get(tenant)
+except TreeError as exc:
+    st.error(str(exc))
+    st.stop()
+# Only versions of this tenant that the worker can still decode are
+# selectable; listing them does not count as cache lookups.
+resident = set(registry.versions(tenant))
+versions = [latest.version] + [v for v in stored_versions(store, tenant) if v != latest.version and v in resident]
+version = st.selectbox("Tree version", versions, format_func=lambda v: f"{v} (current)" if v == latest.version else v)
+tree = registry.get_version(tenant, version) or latest
+
+rollups = load_rollups(store, version, tenant)
+st.metric("Submissions", rollups.total)
+if not rollups.total:
+    st.info("No completed diagnostics stored for this tree version yet.")
+    st.stop()
+
+st.subheader("Paths chosen")
+depth = st.radio("Break down by", range(1, tree.depth + 1), format_func=lambda d: level_name(d - 1), horizontal=True)
+st.dataframe(
+    [
+        {**{level_name(i): label for i, label in enumerate(labels)}, "Submissions": n}
+        for labels, n in path_breakdown(tree, rollups, depth)
+    ],
+    use_container_width=True,
+    hide_index=True,
+)
+
+left, right = st.columns([1.4, 1])
+
+with left:
+    st.subheader("Metrics actually tracked")
+    st.dataframe(
+        [
+            {"Recommended for": r["node"], "Metric": r["metric"], "Tracked": r["tracked"],
+             "Offered": r["offered"], "Tracked %": round(100 * r["rate"], 1)}
+            for r in metric_usage(tree, rollups)
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+with right:
+    st.subheader("Top final outcomes")
+    st.dataframe(
+        [{"Outcome": o, "Submissions": n} for o, n in top_outcomes(tree, rollups)],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+st.subheader("Maturity across the portfolio")
+weights = get_weights(tree)
+st.dataframe(
+    [
+        {"Dimension": s["dimension"], "Mean": round(s["mean"], 1), "P25": round(s["p25"], 1),
+         "Median": round(s["p50"], 1), "P75": round(s["p75"], 1)}
+        for s in portfolio_stats(tenant, version, store.last_id(), tree, weights)
+    ],
+    use_container_width=True,
+    hide_index=True,
+)
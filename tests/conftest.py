@@ -0,0 +1,16 @@
+import pytest
+
+from diagnostic.loader import load_tree
+from diagnostic.store import SummaryStore
+
+
+@pytest.fixture(scope="session")
+def tree():
+    return load_tree()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SummaryStore(tmp_path / "summaries.sqlite3", flush_interval=0.01)
+    yield store
+    store.close()
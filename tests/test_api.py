@@ -0,0 +1,116 @@
+import gzip
+import json
+
+import pytest
+
+from diagnostic import api
+from diagnostic.api import DiagnosticAPI
+from diagnostic.summary import choice_key
+
+
+@pytest.fixture
+def service(store):
+    return DiagnosticAPI(store=store)
+
+
+@pytest.fixture
+def row(tree):
+    labels = tree.path_labels(tree.path_from_index(0))
+    row = {choice_key(depth): label for depth, label in enumerate(labels)}
+    row.update(target_outcomes_12_18_months=[tree.final_outcomes[0]], success_statement="Shipped")
+    return row
+
+
+def post(service, route, payload, headers=None):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    status, _, raw = service.respond("POST", route, headers or {}, body)
+    return status, json.loads(raw)
+
+
+def test_summary(service, row):
+    status, summary = post(service, "/summary", row)
+    assert status == 200
+    assert summary["direction"] == row["direction"]
+
+
+@pytest.mark.parametrize("payload, status", [
+    (b"{not json", 400),
+    ([1, 2], 400),
+])
+def test_malformed_body(service, payload, status):
+    assert post(service, "/summary", payload)[0] == status
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"direction": "Nowhere"}, "unknown path"),
+    ({"direction": ["x"]}, "direction must be a string"),
+    ({"selected_metrics_tracked": [{"a": 1}]}, "selected_metrics_tracked must be a list of strings"),
+    ({"selected_metrics_tracked": ["Not a metric"]}, "metrics not recommended"),
+    ({"target_outcomes_12_18_months": "Financial"}, "must be a list of strings"),
+    ({"notes": 5}, "notes must be a string"),
+    ({"success_statement": 7}, "success_statement must be a string"),
+    ({"submission_id": 3}, "submission_id must be a non-empty string"),
+])
+def test_invalid_response_is_422(service, row, change, message):
+    status, body = post(service, "/summary", {**row, **change})
+    assert status == 422
+    assert message in body["error"]
+
+
+def test_batch_reports_rejected_rows(service, row):
+    status, body = post(service, "/summaries", [row, {**row, "notes": 5}, {"direction": "Nowhere"}])
+    assert status == 200
+    assert len(body["summaries"]) == 1
+    assert [e["row"] for e in body["errors"]] == [2, 3]
+
+
+def test_batch_limits(service, row, monkeypatch):
+    assert post(service, "/summaries", {"rows": []})[0] == 400
+    monkeypatch.setattr(api, "MAX_BATCH", 2)
+    assert post(service, "/summaries", [row] * 3)[0] == 413
+
+
+def test_routes(service):
+    assert service.respond("GET", "/nope", {}, b"")[0] == 404
+    status, headers, _ = service.respond("GET", "/summary", {}, b"")
+    assert status == 405 and ("Allow", "POST") in headers
+    assert service.respond("POST", "/tree", {}, b"")[0] == 405
+
+
+def test_tree_revalidation(service):
+    status, headers, body = service.respond("GET", "/tree", {"accept-encoding": "gzip"}, b"")
+    assert status == 200
+    assert json.loads(gzip.decompress(body))
+    etag = dict(headers)["ETag"]
+    assert service.respond("GET", "/tree", {"if-none-match": etag}, b"")[0] == 304
+
+
+def test_missing_tree_is_500(store, tmp_path):
+    service = DiagnosticAPI(tmp_path / "missing.json", store=store)
+    status, _, body = service.respond("GET", "/tree", {}, b"")
+    assert status == 500
+    assert json.loads(body) == {"error": "tree unavailable"}
+
+
+def test_submissions_are_stored_per_id(service, store, row):
+    post(service, "/summary", row)
+    post(service, "/summary", row)
+    post(service, "/summary", row, {"idempotency-key": "k"})
+    post(service, "/summary", {**row, "notes": "edited"}, {"idempotency-key": "k"})
+    post(service, "/summaries", [row, row], {"idempotency-key": "b"})
+    store.flush()
+    with store.connection() as conn:
+        ids = [sid for (sid,) in conn.execute("SELECT session_id FROM summaries ORDER BY id")]
+    assert len(ids) == 5
+    assert ids[2:] == ["k", "b/1", "b/2"]
+
+
+def test_bad_submission_id_rejects_only_its_row(service, store, row):
+    status, body = post(service, "/summaries", [row, {**row, "submission_id": 3}, {**row, "submission_id": "x"}])
+    assert status == 200
+    assert len(body["summaries"]) == 2
+    assert body["errors"] == [{"row": 2, "error": "submission_id must be a non-empty string"}]
+    store.flush()
+    with store.connection() as conn:
+        ids = [sid for (sid,) in conn.execute("SELECT session_id FROM summaries ORDER BY id")]
+    assert len(ids) == 2 and ids[1] == "x"
@@ -0,0 +1,78 @@
+import pytest
+
+from diagnostic.batch import ResponseError, evaluate, read_responses
+from diagnostic.summary import build_summary, choice_key
+
+PATH = (0, 1, 0, 0)
+
+
+@pytest.fixture
+def row(tree):
+    row = {choice_key(depth): label for depth, label in enumerate(tree.path_labels(PATH))}
+    row.update(
+        timestamp_utc="2025-03-01T12:00:00Z",
+        selected_metrics_tracked=tree.path_metrics(PATH)[:2],
+        target_outcomes_12_18_months=tree.final_outcomes[:2],
+        notes="n",
+        success_statement="s",
+    )
+    return row
+
+
+def test_summary_matches_the_app(tree, row):
+    (summary,) = evaluate([row], tree)
+    expected = build_summary(tree, PATH, row["selected_metrics_tracked"], "n", tree.final_outcomes[:2], "s",
+                             timestamp="2025-03-01T12:00:00Z")
+    assert summary == expected
+    assert list(summary) == list(expected)
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"direction": "Nowhere"}, "unknown path"),
+    ({"direction": ["x"]}, "direction must be a string"),
+    ({"selected_metrics_tracked": ["Not recommended"]}, "metrics not recommended"),
+    ({"selected_metrics_tracked": [{"a": 1}]}, "must be a list of strings"),
+    ({"target_outcomes_12_18_months": ["Nope"]}, "unknown outcomes"),
+    ({"target_outcomes_12_18_months": "Nope"}, "must be a list of strings"),
+    ({"notes": 5}, "notes must be a string"),
+    ({"success_statement": 7}, "success_statement must be a string"),
+])
+def test_invalid_rows_are_collected(tree, row, change, message):
+    errors = []
+    summaries = list(evaluate([row, {**row, **change}, row], tree, errors))
+    assert len(summaries) == 2
+    assert [e.row for e in errors] == [2]
+    assert message in errors[0].message
+
+
+def test_strict_raises_at_the_first_invalid_row(tree, row):
+    with pytest.raises(ResponseError, match="row 2: expected an object"):
+        list(evaluate([row, [1, 2]], tree))
+
+
+def test_unreadable_lines_are_reported_per_row(tree, tmp_path):
+    path = tmp_path / "responses.jsonl"
+    path.write_text('{"direction": "Nowhere"}\n[1, 2]\n\n{bad\n')
+    errors = []
+    assert list(evaluate(read_responses(str(path)), tree, errors)) == []
+    assert [(e.row, e.message.split(":")[0]) for e in errors] == [
+        (1, "unknown path ['Nowhere']"), (2, "expected an object"), (3, "invalid JSON"),
+    ]
+
+
+def test_csv_lists(tree, row, tmp_path):
+    path = tmp_path / "responses.csv"
+    metrics = row["selected_metrics_tracked"]
+    path.write_text(
+        "direction,level_1_choice,level_2_choice,level_3_choice,selected_metrics_tracked,target_outcomes_12_18_months\n"
+        + ",".join(f'"{row[choice_key(d)]}"' for d in range(4))
+        + f',"{metrics[0]} | {metrics[1]}","[""{tree.final_outcomes[0]}""]"\n'
+        + ",".join(f'"{row[choice_key(d)]}"' for d in range(4)) + ',[oops,\n',
+        encoding="utf-8",
+    )
+    errors = []
+    (summary,) = evaluate(read_responses(str(path)), tree, errors)
+    assert summary["selected_metrics_tracked"] == metrics
+    assert summary["target_outcomes_12_18_months"] == list(tree.final_outcomes[:1])
+    assert [e.row for e in errors] == [2]
+    assert "invalid list" in errors[0].message
@@ -0,0 +1,25 @@
+import json
+
+import pytest
+
+from diagnostic.catalog import get_catalog
+
+
+@pytest.mark.parametrize("index", [0, 7, -1])
+@pytest.mark.parametrize("fields", [
+    {},
+    {"notes": "Line one\nline \"two\"", "success": "Cost down 10% ✓"},
+    {"tracked": 2, "outcomes": 3, "notes": "</script>", "success": ""},
+])
+def test_summary_json_matches_json_dumps(tree, index, fields):
+    catalog = get_catalog(tree)
+    path = tree.path_from_index(index % tree.path_count())
+    summary = catalog.summary(
+        path,
+        tracked_metrics=tree.path_metrics(path)[:fields.get("tracked", 0)],
+        notes=fields.get("notes", ""),
+        outcomes=tree.final_outcomes[:fields.get("outcomes", 0)],
+        success=fields.get("success", ""),
+        timestamp="2025-03-01T12:00:00Z",
+    )
+    assert catalog.summary_json(path, summary) == json.dumps(summary, indent=2)
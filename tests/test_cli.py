@@ -0,0 +1,65 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from diagnostic.__main__ import main
+from diagnostic.lazy import pack_tree
+from diagnostic.loader import DEFAULT_TREE_PATH
+
+PATH = (0, 1, 0, 0)
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_validate(tree, tmp_path, capsys):
+    pack_tree(tree, tmp_path / "packed")
+    broken = tmp_path / "broken.json"
+    broken.write_text('{"tree": ', encoding="utf-8")
+
+    assert main(["validate", str(DEFAULT_TREE_PATH), str(tmp_path / "packed")]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].endswith("ok, 147 nodes, 325 paths, depth 4, 5 final outcomes")
+    assert out[1].endswith("ok, packed, 325 paths, depth 4, 5 final outcomes")
+
+    assert main(["validate", str(DEFAULT_TREE_PATH), str(broken), str(tmp_path / "missing.json")]) == 2
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 1
+    errors = captured.err.splitlines()
+    assert len(errors) == 2 and all(line.startswith(str(tmp_path)) for line in errors)
+
+
+def test_evaluate_prints_the_summary(tree, capsys):
+    labels = tree.path_labels(PATH)
+    metric = tree.path_metrics(PATH)[0]
+    argv = ["evaluate", *labels, "--track", metric, "--outcome", tree.final_outcomes[0], "--success", "Done"]
+    assert main(argv) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["direction"] == labels[0]
+    assert summary["selected_metrics_tracked"] == [metric]
+    assert summary["target_outcomes_12_18_months"] == [tree.final_outcomes[0]]
+    assert summary["success_statement"] == "Done"
+
+
+def test_evaluate_errors(tree, tmp_path, capsys):
+    labels = tree.path_labels(PATH)
+    assert main(["evaluate", *labels[:2]]) == 1
+    err = capsys.readouterr().err
+    assert err.startswith("incomplete path; next: ")
+    assert f"  {tree.options(tree.resolve(PATH[:2]))[0]}" in err
+
+    assert main(["evaluate", "Sideways"]) == 1
+    assert "unknown path" in capsys.readouterr().err
+    assert main(["evaluate", *labels, "--track", "Not a metric"]) == 1
+    assert capsys.readouterr().err
+    assert main(["evaluate", *labels, "--tree", str(tmp_path / "missing.json")]) == 2
+
+
+def test_package_import_is_lazy():
+    code = (
+        "import sys, diagnostic; "
+        "assert not [m for m in sys.modules if m.startswith('diagnostic.')]; "
+        "diagnostic.build_summary; "
+        "assert 'diagnostic.summary' in sys.modules and 'diagnostic.loader' not in sys.modules; "
+        "assert 'numpy' not in sys.modules and 'streamlit' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
@@ -0,0 +1,92 @@
+import pytest
+
+from diagnostic.compiled import ROOT_QUESTION, CompiledTree, compile_nodes, compile_tree
+
+TREE = {
+    "Grow": {
+        "question_lvl1": "Where?",
+        "options_lvl1": {
+            "Sales": {
+                "outcome_lvl2": "More revenue", "question_lvl2": "How?", "options_lvl2": ["Upsell", "New logos"],
+                "question_lvl3": "Blocker?", "options_lvl3": ["Pricing", "Capacity", "Churn"], "metrics": ["ARR"],
+            },
+        },
+    },
+    "Shrink": {
+        "question_lvl1": "Where?",
+        "options_lvl1": {
+            "Costs": {
+                "outcome_lvl2": "Lower cost", "question_lvl2": "How?", "options_lvl2": ["Automate"],
+                "question_lvl3": "Blocker?", "options_lvl3": ["Budget"], "metrics": ["Cost per unit"],
+            },
+        },
+    },
+}
+
+
+def test_every_path_index_round_trips(tree):
+    seen = set()
+    for index in range(tree.path_count()):
+        path = tree.path_from_index(index)
+        assert tree.path_index(path) == index
+        assert tree.is_leaf(tree.resolve(path))
+        assert tree.path_for_labels(tree.path_labels(path)) == path
+        seen.add(path)
+    assert len(seen) == tree.path_count() == 325
+    with pytest.raises(IndexError):
+        tree.path_from_index(tree.path_count())
+
+
+def test_prefixes_own_contiguous_ranges(tree):
+    for first in range(tree.n_children(tree.root)):
+        ids = tree.path_range((first,))
+        assert len(ids) == tree.path_count(tree.child(tree.root, first))
+        assert all(tree.path_from_index(i)[0] == first for i in ids)
+    assert tree.path_range(()) == range(tree.path_count())
+    with pytest.raises(ValueError):
+        tree.path_index((0,))
+
+
+def test_level3_options_are_shared_between_level2_options():
+    ct = compile_tree(TREE, ["F"])
+    assert ct.question(ct.root) == ROOT_QUESTION
+    sales = ct.resolve((0, 0))
+    upsell, new_logos = ct.child(sales, 0), ct.child(sales, 1)
+    assert ct.child_offsets(upsell) == ct.child_offsets(new_logos)
+    assert ct.child(upsell, 2) == ct.child(new_logos, 2)
+    assert ct.path_count() == 2 * 3 + 1
+    assert ct.path_labels((0, 0, 1, 2)) == ["Grow", "Sales", "New logos", "Churn"]
+    assert ct.path_metrics((0, 0, 1, 2)) == ["ARR"]
+    assert ct.path_index((1, 0, 0, 0)) == 6
+
+
+def test_lookups_and_strings():
+    ct = compile_tree(TREE, ["F"])
+    assert ct.strings.count("Where?") == 1
+    assert ct.child_index(ct.root, "Shrink") == 1
+    with pytest.raises(KeyError):
+        ct.child_index(ct.root, "Hold")
+    with pytest.raises(KeyError):
+        ct.child_index(ct.resolve((1, 0, 0, 0)), "Budget")
+    with pytest.raises(IndexError):
+        ct.resolve((2,))
+
+
+def test_malformed_trees_are_rejected():
+    with pytest.raises(ValueError, match="duplicate option"):
+        ct = CompiledTree()
+        root = ct.add_node(None)
+        ct.set_children(root, ct.add_children([ct.add_node("A"), ct.add_node("A")]))
+        ct.finish()
+    with pytest.raises(ValueError, match="after their parent"):
+        ct = CompiledTree()
+        child = ct.add_node("A")
+        parent = ct.add_node(None)
+        ct.set_children(parent, ct.add_children([child]))
+
+
+def test_compile_nodes_accepts_leaf_lists_and_empty_options():
+    nodes = compile_nodes({"question": "Q", "options": {"A": {"options": ["x", "y"]}, "B": {}}})
+    assert nodes.path_count() == 3
+    assert nodes.path_labels(nodes.path_from_index(2)) == ["B"]
+    assert nodes.path_for_labels(["A", "y"]) == (0, 1)
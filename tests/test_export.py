@@ -0,0 +1,82 @@
+import csv
+
+import pytest
+
+from diagnostic.export import ExportError, Query, columns, export, main
+from diagnostic.summary import build_summary
+
+PATHS = [(0, 1, 0, 0), (0, 2, 1, 1), (1, 0, 0, 2)]
+
+
+@pytest.fixture
+def filled(tree, store):
+    for k, path in enumerate(PATHS):
+        metrics = tree.path_metrics(path)
+        summary = build_summary(tree, path, metrics[:k], notes=f"n{k}", outcomes=tree.final_outcomes[:k + 1])
+        store.submit(summary, f"s{k}", tree, path, tenant="acme" if k else "default")
+    store.flush()
+    with store.connection() as conn:
+        for k in range(len(PATHS)):
+            conn.execute("UPDATE summaries SET created_utc = ? WHERE session_id = ?", (f"2025-0{k + 1}-15", f"s{k}"))
+    return store
+
+
+def read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_csv_has_one_column_per_list_item(tree, filled, tmp_path):
+    target = str(tmp_path / "all.csv")
+    assert export(filled, target, Query()) == 3
+    rows = read(target)
+    assert [r["session_id"] for r in rows] == ["s0", "s1", "s2"]
+    assert list(rows[0]) == columns(filled, Query())
+    assert "target_outcome_3" in rows[0] and "target_outcome_4" not in rows[0]
+    assert rows[2]["target_outcome_3"] == tree.final_outcomes[2]
+    assert rows[0]["target_outcome_2"] == ""
+    assert [r["direction"] for r in rows] == [tree.path_labels(p)[0] for p in PATHS]
+
+
+@pytest.mark.parametrize("query, sessions", [
+    (dict(tenant="acme"), ["s1", "s2"]),
+    (dict(since="2025-02-01"), ["s1", "s2"]),
+    (dict(until="2025-02-15"), ["s0"]),
+    (dict(since="2025-02-01", until="2025-03-01"), ["s1"]),
+])
+def test_filters(filled, tmp_path, query, sessions):
+    target = str(tmp_path / "out.csv")
+    export(filled, target, Query(**query), chunk_size=1)
+    assert [r["session_id"] for r in read(target)] == sessions
+
+
+def test_direction_and_path_filters(tree, filled, tmp_path):
+    target = str(tmp_path / "out.csv")
+    direction = tree.path_labels(PATHS[0])[0]
+    export(filled, target, Query(direction=direction))
+    assert [r["session_id"] for r in read(target)] == ["s0", "s1"]
+    export(filled, target, Query(path=tree.path_labels(PATHS[1])[:2], tree=tree))
+    assert [r["session_id"] for r in read(target)] == ["s1"]
+    with pytest.raises(ExportError, match="needs the tree"):
+        Query(path=["x"])
+    with pytest.raises(ExportError, match="unknown path"):
+        Query(path=["x"], tree=tree)
+
+
+def test_other_formats(filled, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    assert export(filled, str(tmp_path / "out.parquet"), Query()) == 3
+    assert pq.read_table(tmp_path / "out.parquet").column("session_id").to_pylist() == ["s0", "s1", "s2"]
+    openpyxl = pytest.importorskip("openpyxl")
+    assert export(filled, str(tmp_path / "out.xlsx"), Query(tenant="nobody")) == 0
+    sheet = openpyxl.load_workbook(tmp_path / "out.xlsx").active
+    assert sheet.max_row == 1
+    with pytest.raises(ExportError, match="unsupported export format"):
+        export(filled, str(tmp_path / "out.txt"), Query())
+
+
+def test_cli(filled, tmp_path, capsys):
+    target = tmp_path / "out.csv"
+    assert main([str(target), "--store", str(filled.path), "--tenant", "acme"]) == 0
+    assert "2 summaries" in capsys.readouterr().err
+    assert main([str(target), "--store", str(filled.path), "--path", "Nowhere"]) == 2
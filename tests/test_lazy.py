@@ -0,0 +1,60 @@
+import pytest
+
+from diagnostic.compiled import compile_nodes
+from diagnostic.lazy import LazyTree, main, pack_tree
+from diagnostic.loader import DEFAULT_TREE_PATH, load_tree
+
+UNEVEN = {
+    "question": "Pick one",
+    "final_outcomes": ["F"],
+    "options": {
+        "Short": {"outcome": "Done early", "metrics": ["m1"]},
+        "Long": {"question": "Then", "options": {"Deeper": {"question": "Last", "options": ["x", "y"]}}},
+    },
+}
+
+
+@pytest.fixture
+def packed(tree, tmp_path):
+    pack_tree(tree, tmp_path / "packed")
+    lazy = LazyTree(str(tmp_path / "packed"), cache_size=16)
+    yield lazy
+    lazy.close()
+
+
+def test_packed_tree_matches_the_compiled_one(tree, packed):
+    assert len(packed) == len(tree)
+    assert packed.version == tree.version
+    assert packed.final_outcomes == tree.final_outcomes
+    assert packed.depth == tree.depth == 4
+    assert packed.path_count() == tree.path_count()
+    for index in range(tree.path_count()):
+        path = tree.path_from_index(index)
+        assert packed.path_from_index(index) == path
+        assert packed.path_index(path) == index
+        assert packed.path_labels(path) == tree.path_labels(path)
+        assert packed.path_metrics(path) == tree.path_metrics(path)
+    assert len(packed._cache) <= 16
+
+
+def test_uneven_depth(tmp_path):
+    tree = compile_nodes(UNEVEN)
+    assert tree.depth == 3
+    assert [len(tree.path_from_index(i)) for i in range(tree.path_count())] == [1, 3, 3]
+    pack_tree(tree, tmp_path / "packed")
+    lazy = LazyTree(str(tmp_path / "packed"))
+    try:
+        assert lazy.depth == 3
+        assert lazy.path_labels((1, 0, 1)) == ["Long", "Deeper", "y"]
+        assert lazy.path_metrics((0,)) == ["m1"]
+    finally:
+        lazy.close()
+
+
+def test_packed_directory_loads_lazily(tmp_path, capsys):
+    target = tmp_path / "packed"
+    assert main([str(DEFAULT_TREE_PATH), str(target)]) == 0
+    assert "packed" in capsys.readouterr().err
+    tree = load_tree(target)
+    assert isinstance(tree, LazyTree)
+    assert tree.path_count() == 325
@@ -0,0 +1,63 @@
+import json
+import shutil
+
+import pytest
+
+from diagnostic import loader
+from diagnostic.loader import DEFAULT_TREE_PATH, TreeCache, TreeError, load_tree
+
+
+LEAF = {
+    "outcome_lvl2": "Outcome", "question_lvl2": "Q2", "options_lvl2": ["a"],
+    "question_lvl3": "Q3", "options_lvl3": ["b"], "metrics": ["m"],
+}
+
+
+@pytest.mark.parametrize("name, text, message", [
+    ("bad.json", '{"tree": ', "invalid JSON"),
+    ("bad.json", '{"final_outcomes": []}', "invalid tree definition"),
+    ("bad.json", json.dumps({
+        "final_outcomes": ["F"], "tree": {"D": {"question_lvl1": 3, "options_lvl1": {"C": LEAF}}},
+    }), "question_lvl1: expected a non-empty string"),
+    ("bad.json", json.dumps({
+        "final_outcomes": ["F"],
+        "tree": {"D": {"question_lvl1": "Q1", "options_lvl1": {"C": {**LEAF, "outcome_lvl2": None}}}},
+    }), "outcome_lvl2: expected a non-empty string"),
+    ("bad.yaml", "final_outcomes: [F]\nquestion: Q\noptions: {1: {outcome: O}}\n", "1: expected a non-empty string"),
+    ("bad.yaml", "final_outcomes: [F]\nquestion: Q\noptions: {A: {question: '', options: [x]}}\n",
+     "question: expected a non-empty string"),
+])
+def test_bad_definitions_raise_tree_error(tmp_path, name, text, message):
+    path = tmp_path / name
+    path.write_text(text)
+    with pytest.raises(TreeError, match=message):
+        load_tree(path)
+
+
+def test_missing_definition_raises_tree_error(tmp_path):
+    with pytest.raises(TreeError, match="cannot read"):
+        load_tree(tmp_path / "missing.json")
+
+
+def test_failed_reload_keeps_the_last_good_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "CHECK_INTERVAL", 0.0)
+    path = str(tmp_path / "tree.json")
+    shutil.copy(DEFAULT_TREE_PATH, path)
+    cache = TreeCache()
+    good = cache.get(path)
+    with open(path, "w") as f:
+        f.write('{"tree": ')
+    assert cache.get(path) is good
+    assert cache.versions(path) == [good.version]
+
+
+def test_invalid_edit_keeps_the_last_good_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "CHECK_INTERVAL", 0.0)
+    path = str(tmp_path / "tree.yaml")
+    with open(path, "w") as f:
+        f.write("final_outcomes: [F]\nquestion: Q\noptions: {A: {outcome: O}}\n")
+    cache = TreeCache()
+    good = cache.get(path)
+    with open(path, "w") as f:
+        f.write("final_outcomes: [F]\nquestion: Q\noptions: {1: {outcome: O}}\n")
+    assert cache.get(path) is good
@@ -0,0 +1,39 @@
+import os
+
+from diagnostic.reports import build_reports, safe_name
+from diagnostic.summary import build_summary
+
+PATH = (0, 1, 0, 0)
+
+
+def submit(tree, store, session_id, workshop):
+    summary = build_summary(tree, PATH, outcomes=[tree.final_outcomes[0]], success="Shipped")
+    store.submit(summary, session_id, tree, PATH, workshop=workshop)
+
+
+def read_all(directory):
+    return "".join(
+        open(os.path.join(root, name), encoding="utf-8").read()
+        for root, _, names in os.walk(directory) for name in names if name.endswith(".html")
+    )
+
+
+def test_html_reports_escape_ids_and_workshops(tree, store, tmp_path):
+    submit(tree, store, "<img src=x onerror=alert(1)>", "<script>alert(2)</script>")
+    store.flush()
+    assert build_reports(store, tmp_path, ["html"], workers=1) == (2, 0)
+    text = read_all(tmp_path)
+    assert "<script>alert" not in text and "<img" not in text
+    assert "&lt;script&gt;alert(2)&lt;/script&gt;" in text
+    assert "&lt;img src=x onerror=alert(1)&gt;" in text
+
+
+def test_similar_ids_get_their_own_reports(tree, store, tmp_path):
+    assert safe_name("b/1") != safe_name("b_1")
+    submit(tree, store, "b/1", None)
+    submit(tree, store, "b_1", None)
+    store.flush()
+    assert build_reports(store, tmp_path, ["md"], workers=1) == (2, 0)
+    assert len(os.listdir(tmp_path / "participants")) == 2
+    # Unchanged reports are skipped on the next run.
+    assert build_reports(store, tmp_path, ["md"], workers=1) == (0, 2)
@@ -0,0 +1,97 @@
+import json
+
+import numpy as np
+import pytest
+
+from diagnostic.scoring import (
+    Weights, WeightsError, default_weights, feature_names, load_weights, main, portfolio, score_store,
+    score_summaries, score_summary,
+)
+from diagnostic.summary import build_summary
+
+PATHS = [(0, 1, 0, 0), (1, 0, 1, 2), (2, 2, 0, 1)]
+
+
+def summaries(tree):
+    result = []
+    for k, path in enumerate(PATHS):
+        metrics = tree.path_metrics(path)
+        result.append(build_summary(
+            tree, path, metrics[:k + 1], notes="n" * k, outcomes=tree.final_outcomes[:k + 1], success="" if k == 1 else "Done",
+        ))
+    return result
+
+
+def test_single_batch_and_stored_scores_agree(tree, store):
+    weights = default_weights(tree)
+    rows = summaries(tree)
+    batch = score_summaries(tree, rows, weights)
+    assert batch.shape == (len(rows), len(weights.dimensions))
+    for path, summary, expected in zip(PATHS, rows, batch):
+        single = score_summary(tree, summary, weights)
+        assert list(single) == list(weights.dimensions)
+        assert np.allclose(list(single.values()), expected)
+        assert score_summary(tree, summary, weights, path=path) == single
+    for session, (path, summary) in enumerate(zip(PATHS, rows)):
+        store.submit(summary, str(session), tree, path)
+    store.flush()
+    assert np.allclose(score_store(store, tree, weights), batch)
+    assert score_store(store, tree, weights, tenant="other").shape == (0, len(weights.dimensions))
+
+
+def test_scores_follow_the_weights(tree):
+    empty = build_summary(tree, PATHS[0])
+    full = summaries(tree)[2]
+    weights = default_weights(tree)
+    low, high = score_summary(tree, empty, weights), score_summary(tree, full, weights)
+    assert low["Evidence"] == 0 and low["Focus"] == 0
+    assert high["Evidence"] > 0 and high["Focus"] > 0
+    assert all(0 <= v <= 100 for v in high.values())
+
+    custom = Weights.from_mapping(tree, {"Notes": {"notes": 1}})
+    assert score_summary(tree, full, custom) == {"Notes": 100.0}
+    assert Weights.from_mapping(tree, weights.to_mapping()).to_mapping() == weights.to_mapping()
+
+
+@pytest.mark.parametrize("mapping, message", [
+    ({}, "must map dimension names"),
+    ({"D": 1}, "expected a mapping"),
+    ({"D": {"nope": 1}}, "unknown feature"),
+    ({"D": {"notes": "high"}}, "must be a number"),
+])
+def test_bad_weights(tree, mapping, message):
+    with pytest.raises(WeightsError, match=message):
+        Weights.from_mapping(tree, mapping)
+
+
+def test_weights_file(tree, tmp_path):
+    path = tmp_path / "weights.json"
+    path.write_text(json.dumps({"Notes": {"notes": 0.5}}), encoding="utf-8")
+    assert load_weights(str(path), tree).dimensions == ("Notes",)
+    path.write_text("{", encoding="utf-8")
+    with pytest.raises(WeightsError):
+        load_weights(str(path), tree)
+    assert len(feature_names(tree)) == 4 + 2 * len(tree.final_outcomes) + tree.n_children(tree.root)
+
+
+def test_portfolio(tree):
+    weights = default_weights(tree)
+    scores = score_summaries(tree, summaries(tree), weights)
+    stats = portfolio(scores, weights)
+    assert [s["dimension"] for s in stats] == list(weights.dimensions)
+    for j, s in enumerate(stats):
+        assert s["p25"] <= s["p50"] <= s["p75"]
+        assert s["mean"] == pytest.approx(scores[:, j].mean())
+    assert portfolio(score_summaries(tree, [], weights), weights) == []
+
+
+def test_cli(tree, tmp_path, capsys):
+    source = tmp_path / "summaries.jsonl"
+    source.write_text("".join(json.dumps(s) + "\n" for s in summaries(tree)), encoding="utf-8")
+    target = tmp_path / "scores.jsonl"
+    assert main([str(source), "-o", str(target)]) == 0
+    assert len(target.read_text(encoding="utf-8").splitlines()) == len(PATHS)
+    assert "Evidence" in capsys.readouterr().err
+
+    source.write_text(json.dumps({**summaries(tree)[0], "direction": "Sideways"}) + "\n", encoding="utf-8")
+    assert main([str(source)]) == 1
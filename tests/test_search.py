@@ -0,0 +1,58 @@
+from diagnostic.search import SearchIndex, get_index, tokenize
+
+
+def test_tokenize():
+    assert tokenize("SLA / Customer-Experience 2x") == ["sla", "customer", "experience", "2x"]
+
+
+def test_prefixes_of_every_query_token_must_match(tree):
+    index = get_index(tree)
+    assert get_index(tree) is index
+    hits = index.search("unit cost", limit=50)
+    assert hits
+    for hit in hits:
+        words = tokenize(hit.text)
+        assert any(w.startswith("unit") for w in words) and any(w.startswith("cost") for w in words)
+    assert index.search("zzzz") == []
+    assert index.search("  ") == []
+
+
+def test_hits_point_at_their_place_in_the_tree(tree):
+    index = SearchIndex(tree)
+    for hit in index.docs:
+        if hit.kind == "final_outcome":
+            assert hit.path is None and hit.text in tree.final_outcomes
+            continue
+        assert hit.path
+        nid = tree.resolve(hit.path)
+        texts = {"option": tree.label(nid), "question": tree.question(nid), "outcome": tree.outcome(nid)}
+        assert hit.text in (tree.metrics(nid) if hit.kind == "metric" else [texts[hit.kind]])
+
+
+def test_root_question_is_not_indexed(tree):
+    index = SearchIndex(tree)
+    assert all(hit.path != () for hit in index.docs)
+    assert not any(hit.text == tree.question(tree.root) for hit in index.docs)
+
+
+def test_repeated_texts_are_one_hit(tree):
+    index = SearchIndex(tree)
+    keys = [(hit.kind, hit.text) for hit in index.docs]
+    assert len(keys) == len(set(keys))
+    assert len(index.search("root pattern", limit=8)) == 1
+
+
+def test_results_are_ranked_and_limited(tree):
+    index = SearchIndex(tree)
+    hits = index.search("c", limit=5)
+    assert len(hits) == 5
+    ranks = [index.docs.index(hit) for hit in hits]
+    assert ranks == sorted(ranks)
+
+
+def test_long_tokens_are_checked_in_full(tree):
+    index = SearchIndex(tree)
+    word = max((w for hit in index.docs for w in tokenize(hit.text)), key=len)
+    assert len(word) > 12
+    assert index.search(word)
+    assert index.search(word[:12] + "qqqq") == []
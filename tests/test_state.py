@@ -0,0 +1,38 @@
+import pytest
+
+from diagnostic.state import PackedState, StateError, decode, encode
+
+
+@pytest.mark.parametrize("state", [
+    PackedState(),
+    PackedState((0, 1, 0, 0), 0b10110, 0b101, "Notes", "Success"),
+    PackedState((3, 200, 7), 1 << 70, 1 << 12, "ünïcødé ✓", ""),
+    # Long, repetitive text takes the compressed format.
+    PackedState((1, 2), 0, 0, "same words " * 200, "x"),
+])
+def test_round_trip(state):
+    token = encode(state, "v1")
+    assert token.isascii() and "=" not in token
+    assert decode(token, "v1") == state
+
+
+def test_other_tree_version_is_rejected():
+    token = encode(PackedState((0, 1)), "v1")
+    with pytest.raises(StateError, match="different tree version"):
+        decode(token, "v2")
+
+
+def test_unversioned_decode_accepts_any_version():
+    assert decode(encode(PackedState((2,)), "v1")) == PackedState((2,))
+
+
+@pytest.mark.parametrize("token", ["", "!!!", "AA", "CQAAAAA", "AQAAAAAF"])
+def test_bad_tokens_are_rejected(token):
+    with pytest.raises(StateError):
+        decode(token)
+
+
+def test_truncated_token_is_rejected():
+    token = encode(PackedState((0, 1), 3, 1, "notes", "success"))
+    with pytest.raises(StateError):
+        decode(token[:-6])
@@ -0,0 +1,52 @@
+import json
+import re
+
+from diagnostic.compiled import compile_nodes, tree_payload
+from diagnostic.static import PLACEHOLDER, build_html, main
+from diagnostic.summary import LEVEL_NAMES
+
+
+def embedded(html):
+    return json.loads(re.search(r'<script id="tree" type="application/json">(.*?)</script>', html, re.S).group(1))
+
+
+def payload_paths(payload, node=0, prefix=()):
+    label, _, _, _, children = payload["nodes"][node]
+    if node:
+        prefix += (payload["strings"][label],)
+    if not children:
+        return [prefix]
+    return [path for child in children for path in payload_paths(payload, child, prefix)]
+
+
+def test_payload_walks_the_same_paths(tree):
+    payload = tree_payload(tree)
+    paths = payload_paths(payload)
+    assert paths == [tuple(tree.path_labels(tree.path_from_index(i))) for i in range(tree.path_count())]
+    assert payload["final_outcomes"] == list(tree.final_outcomes)
+    # Shared level-3 options are stored once.
+    assert len(payload["nodes"]) == len(tree)
+
+
+def test_html_embeds_the_tree(tree):
+    html = build_html(tree)
+    assert PLACEHOLDER not in html
+    data = embedded(html)
+    assert data["level_names"] == list(LEVEL_NAMES)
+    assert data["nodes"] == tree_payload(tree)["nodes"]
+
+
+def test_script_end_tags_in_labels_are_escaped():
+    tree = compile_nodes({"question": "Q", "final_outcomes": ["F"], "options": ["</script><b>x"]})
+    html = build_html(tree)
+    assert "</script><b>" not in html
+    assert embedded(html)["strings"][0] == "Q"
+    assert "</script><b>x" in embedded(html)["strings"]
+
+
+def test_cli_writes_the_file(tree, tmp_path, capsys):
+    target = tmp_path / "dist" / "diagnostic.html"
+    assert main(["-o", str(target)]) == 0
+    assert embedded(target.read_text(encoding="utf-8"))["version"] == tree.version
+    assert "325 paths" in capsys.readouterr().err
+    assert main(["-o", str(target), "--tree", str(tmp_path / "missing.json")]) == 2
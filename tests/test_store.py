@@ -0,0 +1,105 @@
+import sqlite3
+
+from diagnostic.analytics import load_cohort, load_rollups, stored_versions
+from diagnostic.summary import build_summary
+
+PATH = (0, 1, 0, 0)
+OTHER = (0, 1, 0, 1)
+
+
+def complete(tree, path, tracked=0, outcome=0, success="Shipped"):
+    metrics = tree.path_metrics(path)
+    return build_summary(tree, path, metrics[:tracked], outcomes=[tree.final_outcomes[outcome]], success=success)
+
+
+def rows(store):
+    with store.connection() as conn:
+        return conn.execute("SELECT session_id, path_index FROM summaries ORDER BY id").fetchall()
+
+
+def test_repeated_state_is_stored_once(tree, store):
+    summary = complete(tree, PATH)
+    first = store.submit(summary, "a", tree, PATH)
+    # Same answers, later timestamp: skipped before it reaches the writer.
+    again = store.submit({**summary, "timestamp_utc": "2030-01-01T00:00:00Z"}, "a", tree, PATH)
+    store.flush()
+    assert first == again
+    assert store.count() == 1
+    assert load_rollups(store, tree.version).total == 1
+
+
+def test_later_state_replaces_the_record_and_moves_rollups(tree, store):
+    for tracked in range(3):
+        store.submit(complete(tree, PATH, tracked=tracked), "a", tree, PATH, workshop="w")
+    store.flush()
+    store.submit(complete(tree, OTHER, tracked=1, outcome=1), "a", tree, OTHER, workshop="w")
+    store.submit(complete(tree, PATH, tracked=2), "b", tree, PATH, workshop="w")
+    store.flush()
+
+    assert [sid for sid, _ in rows(store)] == ["a", "b"]
+    rollups = load_rollups(store, tree.version)
+    assert rollups.paths == {tree.path_index(PATH): 1, tree.path_index(OTHER): 1}
+    assert rollups.outcomes == {0: 1, 1: 1}
+    node = tree.path_metrics_node(PATH)
+    assert sum(n for (nid, _), n in rollups.metrics.items() if nid == node) == 3
+    assert rollups.total == store.count()
+
+
+def test_without_session_each_summary_is_its_own_record(tree, store):
+    summary = complete(tree, PATH)
+    store.submit(summary, tree=tree, path=PATH)
+    store.submit(summary, tree=tree, path=PATH)
+    store.submit({**summary, "timestamp_utc": "2030-01-01T00:00:00Z"}, tree=tree, path=PATH)
+    store.flush()
+    assert store.count() == 2
+
+
+def test_rewriting_a_record_moves_it_to_a_fresh_id(tree, store):
+    store.submit(complete(tree, PATH), "a", tree, PATH)
+    store.flush()
+    before = store.last_id()
+    store.submit(complete(tree, PATH, tracked=1), "a", tree, PATH)
+    store.flush()
+    assert store.count() == 1
+    assert store.last_id() > before
+
+
+def test_tenants_with_the_same_tree_are_counted_apart(tree, store):
+    store.submit(complete(tree, PATH), "a", tree, PATH)
+    store.submit(complete(tree, PATH), "a", tree, PATH, tenant="acme")
+    store.submit(complete(tree, PATH), "b", tree, PATH, tenant="acme")
+    store.flush()
+    assert load_rollups(store, tree.version).total == 1
+    assert load_rollups(store, tree.version, "acme").total == 2
+    assert stored_versions(store, "other") == []
+
+
+def test_cohort_leaves_out_the_participant(tree, store):
+    store.submit(complete(tree, PATH, tracked=1), "a", tree, PATH, workshop="w")
+    store.submit(complete(tree, PATH, tracked=3), "b", tree, PATH, workshop="w")
+    store.submit(complete(tree, PATH, tracked=2), "c", tree, PATH, workshop="other")
+    store.flush()
+    assert load_cohort(store, tree, PATH, "w").coverage == {1: 1, 3: 1}
+    cohort = load_cohort(store, tree, PATH, "w", session_id="a")
+    assert cohort.coverage == {3: 1}
+    assert cohort.total == 1
+    assert cohort.quantile(0.5) == 3
+
+
+def test_dropped_batch_is_submitted_again(tree, store, monkeypatch):
+    write_batch = store._write_batch
+
+    def locked(conn, batch):
+        raise sqlite3.OperationalError("database is locked")
+
+    summary = complete(tree, PATH)
+    monkeypatch.setattr(store, "_write_batch", locked)
+    store.submit(summary, "a", tree, PATH)
+    store.flush()
+    assert store.count() == 0
+
+    monkeypatch.setattr(store, "_write_batch", write_batch)
+    store.submit(summary, "a", tree, PATH)
+    store.flush()
+    assert store.count() == 1
+    assert load_rollups(store, tree.version).total == 1
@@ -0,0 +1,70 @@
+import json
+import shutil
+
+import pytest
+
+from diagnostic import loader
+from diagnostic.loader import DEFAULT_TREE_PATH
+from diagnostic.tenants import TenantError, TreeRegistry
+
+
+@pytest.fixture
+def tenant_dir(tmp_path):
+    shutil.copy(DEFAULT_TREE_PATH, tmp_path / "acme.json")
+    (tmp_path / "small.json").write_text(json.dumps({
+        "final_outcomes": ["F"], "question": "Q", "options": {"A": {"outcome": "O"}, "B": {"outcome": "P"}},
+    }))
+    return tmp_path
+
+
+@pytest.mark.parametrize("tenant, message", [("../etc", "invalid tenant"), ("", "invalid tenant"),
+                                             ("nobody", "unknown tenant")])
+def test_bad_tenants(tenant_dir, tenant, message):
+    with pytest.raises(TenantError, match=message):
+        TreeRegistry(tenant_dir).get(tenant)
+
+
+def test_tenants_share_nothing_but_the_budget(tenant_dir):
+    registry = TreeRegistry(tenant_dir)
+    acme, small = registry.get("acme"), registry.get("small")
+    assert acme.path_count() == 325 and small.path_count() == 2
+    assert registry.get("acme") is acme
+    assert registry.get("default").version == acme.version
+    stats = registry.stats()
+    assert (stats["trees"], stats["hits"], stats["misses"]) == (3, 1, 3)
+    assert stats["bytes"] == acme.nbytes() * 2 + small.nbytes()
+
+
+def test_least_recently_used_trees_are_evicted(tenant_dir):
+    probe = TreeRegistry(tenant_dir)
+    budget = probe.get("acme").nbytes() + probe.get("small").nbytes()
+    registry = TreeRegistry(tenant_dir, max_bytes=budget)
+    acme = registry.get("acme")
+    registry.get("small")
+    registry.get("default")
+    assert registry.stats()["evictions"] == 1
+    assert registry.versions("acme") == []
+    assert registry.get_version("default", acme.version) is not None
+
+
+def test_listing_versions_is_not_a_lookup(tenant_dir):
+    registry = TreeRegistry(tenant_dir)
+    version = registry.get("small").version
+    before = registry.stats()
+    assert registry.versions("small") == [version]
+    assert registry.stats() == before
+
+
+def test_pinned_versions_survive_an_edit(tenant_dir, monkeypatch):
+    monkeypatch.setattr(loader, "CHECK_INTERVAL", 0.0)
+    registry = TreeRegistry(tenant_dir)
+    old = registry.get("small")
+    (tenant_dir / "small.json").write_text(json.dumps({
+        "final_outcomes": ["F"], "question": "Q", "options": {"A": {"outcome": "O"}},
+    }))
+    new = registry.get("small")
+    assert new.version != old.version and new.path_count() == 1
+    assert registry.get_version("small", old.version) is old
+    # A half-saved file keeps the current version.
+    (tenant_dir / "small.json").write_text('{"final_outcomes": [')
+    assert registry.get("small") is new